@@ -0,0 +1,111 @@
+"""Class-level analytics over progress events, computed on pandas columns.
+
+Events arrive as a DataFrame with one row per progress event. Nothing here
+loops over events in Python; grouping, ranking and counting are vectorized.
+"""
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Share of students in the upper and lower groups of the discrimination index
+DISCRIMINATION_GROUP = 0.27
+
+
+def module_mastery(events: pd.DataFrame, module_ids: List[str], threshold: float) -> List[Dict[str, Any]]:
+    """Per module: students, exercise accuracy, best quiz score and mastery.
+
+    A student's mastery of a module is their best quiz score, or their exercise
+    accuracy when they have not taken the quiz.
+    """
+    if events.empty:
+        accuracy = best_score = pd.Series(dtype=float, index=pd.MultiIndex.from_arrays([[], []]))
+        module_index = pd.Index([])
+    else:
+        # Group on integer codes rather than id strings
+        modules, module_index = pd.factorize(events["module_id"])
+        users = pd.factorize(events["user_id"])[0]
+        exercise = (events["event_type"] == "exercise_answered").to_numpy()
+        quiz = (events["event_type"] == "quiz_scored").to_numpy()
+        accuracy = (pd.Series(events["is_correct"].to_numpy(dtype=float)[exercise])
+                    .groupby([modules[exercise], users[exercise]]).mean())
+        best_score = (pd.Series(events["score"].to_numpy(dtype=float)[quiz])
+                      .groupby([modules[quiz], users[quiz]]).max())
+    mastery = best_score.combine_first(accuracy)
+
+    by_module = pd.DataFrame({
+        "students": mastery.groupby(level=0).size(),
+        "mastery": mastery.groupby(level=0).mean(),
+        "mastered": (mastery >= threshold).groupby(level=0).mean(),
+        "exercise_accuracy": accuracy.groupby(level=0).mean(),
+        "quiz_score": best_score.groupby(level=0).mean(),
+    })
+    by_module.index = module_index[by_module.index.to_numpy(dtype=int)]
+    by_module = by_module.reindex(module_ids)
+    by_module["students"] = by_module["students"].fillna(0).astype(int)
+    return [
+        {"module_id": module_id, **{k: int(v) if k == "students" else _number(v) for k, v in row.items()}}
+        for module_id, row in zip(by_module.index, by_module.to_dict("records"))
+    ]
+
+
+def question_stats(answers: pd.DataFrame, questions: List[Dict[str, Any]], top_wrong: int = 3) -> List[Dict[str, Any]]:
+    """Difficulty, discrimination and most chosen wrong options for every quiz question.
+
+    `answers` holds question_answered events (user_id, item_index, selected_option,
+    is_correct, created_at); each student's first answer to a question counts.
+    `questions` are the quiz questions, for option texts. Answers to questions
+    or options the quiz does not have (it may have changed since) are skipped.
+    """
+    results = [{"item_index": i, "question": q.get("question"), "responses": 0, "difficulty": None,
+              "discrimination": None, "wrong_options": []} for i, q in enumerate(questions)]
+    if not answers.empty:
+        answers = answers[pd.to_numeric(answers["item_index"]).between(0, len(questions) - 1)]
+    if answers.empty:
+        return results
+
+    answers = answers.assign(item_index=answers["item_index"].astype(int), user=pd.factorize(answers["user_id"])[0])
+    first = answers.sort_values("created_at", kind="stable").drop_duplicates(["user", "item_index"])
+    correct = first["is_correct"].astype(float)
+
+    # Students ranked by their share of correct answers; upper and lower 27% groups
+    users = first["user"].to_numpy()
+    totals = np.bincount(users, weights=correct.to_numpy()) / np.maximum(np.bincount(users), 1)
+    answered = np.bincount(users) > 0
+    low_cut, high_cut = np.quantile(totals[answered], [DISCRIMINATION_GROUP, 1 - DISCRIMINATION_GROUP])
+    upper = (totals >= high_cut)[users]
+    lower = (totals <= low_cut)[users]
+
+    items = first["item_index"]
+    stats = pd.DataFrame({
+        "responses": correct.groupby(items).size(),
+        "difficulty": correct.groupby(items).mean(),
+    })
+    stats["discrimination"] = correct[upper].groupby(items[upper]).mean() - correct[lower].groupby(items[lower]).mean()
+
+    option_counts = np.array([len(q.get("options") or []) for q in questions])
+    in_range = pd.to_numeric(first["selected_option"]).between(0, option_counts[first["item_index"].to_numpy()] - 1)
+    wrong = first[~first["is_correct"].astype(bool) & in_range]
+    wrong_counts = (wrong.groupby(["item_index", wrong["selected_option"].astype(int)]).size()
+                    .rename("count").reset_index()
+                    .sort_values(["item_index", "count"], ascending=[True, False], kind="stable"))
+    wrong_counts = wrong_counts.groupby("item_index").head(top_wrong)
+    wrong_by_item: Dict[int, List[Dict[str, Any]]] = {}
+    for item_index, option, count in wrong_counts.itertuples(index=False):
+        wrong_by_item.setdefault(item_index, []).append({
+            "option": int(option),
+            "option_text": questions[item_index]["options"][option]["option_text"],
+            "count": int(count),
+        })
+
+    for entry in results:
+        i = entry["item_index"]
+        if i in stats.index:
+            entry.update({k: _number(v) for k, v in stats.loc[i].items()})
+            entry["responses"] = int(entry["responses"])
+        entry["wrong_options"] = wrong_by_item.get(i, [])
+    return results
+
+
+def _number(value) -> Optional[float]:
+    return None if pd.isna(value) else round(float(value), 4)
@@ -0,0 +1,34 @@
+"""Measure batch generation throughput of the parametric exercise templates.
+
+Run from the backend directory:
+
+    python benchmarks/exercise_generation.py --sizes 100 1000 10000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from exercise_templates import TEMPLATES  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for template in TEMPLATES.values():
+        print(template.name)
+        for size in args.sizes:
+            started = time.perf_counter()
+            for seed in range(args.repeat):
+                template.generate(seed, size)
+            elapsed = (time.perf_counter() - started) / args.repeat
+            print(f"  {size:>7} exercises  {elapsed * 1000:>9.1f} ms  {size / elapsed:>11,.0f} exercises/s")
+
+
+if __name__ == "__main__":
+    main()
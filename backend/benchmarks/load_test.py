@@ -0,0 +1,242 @@
+"""Load-test the read API against a synthetic curriculum and write a JSON report.
+
+Seeds 6 grades with hundreds of topics, thousands of modules and large quizzes
+through the curriculum importer, then drives every endpoint with concurrent
+httpx clients over an in-process ASGI transport. Run from the backend directory:
+
+    # against a local mongod (a throwaway database is created and dropped)
+    python benchmarks/load_test.py --mongo-url mongodb://localhost:27017
+
+    # without a server, using mongomock-motor
+    python benchmarks/load_test.py --mongomock --topics-per-grade 10 --modules-per-topic 5
+
+Pass --baseline with an earlier report to fail when a scenario's p95 latency
+regresses by more than --max-regression.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+CONTENT_TYPES = ["glossary", "theory", "learning_exercises", "practice_exercises", "quiz"]
+DIFFICULTIES = ["easy", "medium", "hard"]
+
+
+def options(i: int, correct: int = 1):
+    return [{"option_text": f"{i + k}", "is_correct": k == correct} for k in range(4)]
+
+
+def synthetic_records(grades: int, topics_per_grade: int, modules_per_topic: int, quiz_questions: int):
+    for g in range(grades):
+        grade_number = 7 + g
+        yield {"type": "grade", "grade_number": grade_number, "grade_name": f"Grado {grade_number}",
+               "description": f"Grado sintético {grade_number}"}
+        for t in range(1, topics_per_grade + 1):
+            yield {"type": "topic", "grade_number": grade_number, "order": t, "name": f"Tema {t}",
+                   "description": f"Tema sintético {t} del grado {grade_number}", "icon": "book"}
+            for m in range(1, modules_per_topic + 1):
+                keys = {"grade_number": grade_number, "topic_order": t}
+                yield {"type": "module", **keys, "order": m, "name": f"Módulo {m}",
+                       "description": f"Módulo sintético {m} del tema {t}"}
+                content_keys = {**keys, "module_order": m}
+                yield {"type": "content", **content_keys, "content_type": "glossary", "title": "Glosario",
+                       "glossary_terms": [{"term": f"Término {i}", "definition": f"Definición del término número {i}",
+                                           "example": f"Ejemplo {i}"} for i in range(10)]}
+                yield {"type": "content", **content_keys, "content_type": "theory", "title": "Teoría",
+                       "theory_content": "\n".join(f"## Sección {i}\nLos números enteros y sus propiedades, parte {i}."
+                                                   for i in range(40))}
+                for content_type, count in (("learning_exercises", 5), ("practice_exercises", 15)):
+                    yield {"type": "content", **content_keys, "content_type": content_type, "title": "Ejercicios",
+                           "exercises": [{"problem": f"¿Cuánto es {i} + {i}?", "options": options(2 * i, 0),
+                                          "difficulty": DIFFICULTIES[i % 3], "explanation": f"{i} + {i} = {2 * i}"}
+                                         for i in range(count)]}
+                yield {"type": "content", **content_keys, "content_type": "quiz", "title": "Quiz",
+                       "quiz_questions": [{"question": f"Pregunta {i}: ¿Cuál es el valor de |-{i}|?",
+                                           "options": options(i), "explanation": f"|-{i}| = {i}"}
+                                          for i in range(quiz_questions)]}
+
+
+def build_scenarios(server, user_ids):
+    cache = server.curriculum_cache
+    grades = list(cache.grades)
+    topics = list(cache.topics)
+    modules = list(cache.modules)
+    quiz_length = len(server.content_snapshots.answer_keys[modules[0]]["correct"])
+
+    def pick(ids):
+        return lambda: random.choice(ids)
+
+    grade, topic, module, user = pick(grades), pick(topics), pick(modules), pick(user_ids)
+    scenarios = [
+        ("grades", "GET", lambda: "/api/grades", None),
+        ("grade", "GET", lambda: f"/api/grades/{grade()}", None),
+        ("tree", "GET", lambda: "/api/tree", None),
+        ("grade_tree", "GET", lambda: f"/api/grades/by-number/{random.randint(7, 6 + len(grades))}/tree", None),
+        ("topics_by_grade", "GET", lambda: f"/api/grades/{grade()}/topics", None),
+        ("topic", "GET", lambda: f"/api/topics/{topic()}", None),
+        ("modules_by_topic", "GET", lambda: f"/api/topics/{topic()}/modules", None),
+        ("module", "GET", lambda: f"/api/modules/{module()}", None),
+        ("content_list", "GET", lambda: f"/api/modules/{module()}/content", None),
+        ("content_summary", "GET", lambda: f"/api/modules/{module()}/content?fields=summary", None),
+        # Paginated reads and dashboards skip the snapshots and query MongoDB
+        ("content_page", "GET", lambda: f"/api/modules/{module()}/content?limit=2", None),
+        ("topic_progress", "GET", lambda: f"/api/topics/{topic()}/progress", None),
+        ("leaderboard", "GET", lambda: f"/api/grades/{grade()}/leaderboard", None),
+        ("search", "GET", lambda: f"/api/search?q={random.choice(['numeros', 'valor absoluto', 'termino 3', 'pregunta'])}", None),
+        ("quiz_grade", "POST", lambda: f"/api/modules/{module()}/quiz/grade",
+         lambda: {"answers": [random.randint(0, 3) for _ in range(quiz_length)]}),
+        ("progress", "POST", lambda: f"/api/users/{user()}/progress",
+         lambda: {"event_type": "exercise_answered", "module_id": module(), "is_correct": random.random() < 0.7}),
+        ("health", "GET", lambda: "/api/health", None),
+    ]
+    for content_type in CONTENT_TYPES:
+        scenarios.append((f"content_{content_type}", "GET",
+                          lambda content_type=content_type: f"/api/modules/{module()}/content/{content_type}", None))
+    return scenarios
+
+
+async def run_scenario(http, method, make_url, make_body, requests: int, concurrency: int, headers):
+    latencies = []
+    errors = 0
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            response = await http.request(method, make_url(), json=make_body() if make_body else None, headers=headers)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    ms = np.array(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "latency_ms": {
+            "mean": round(float(ms.mean()), 3),
+            "p50": round(float(np.percentile(ms, 50)), 3),
+            "p95": round(float(np.percentile(ms, 95)), 3),
+            "p99": round(float(np.percentile(ms, 99)), 3),
+            "max": round(float(ms.max()), 3),
+        },
+    }
+
+
+def compare(report, baseline, max_regression: float):
+    regressions = []
+    for name, result in report["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if before and result["latency_ms"]["p95"] > before["latency_ms"]["p95"] * (1 + max_regression):
+            regressions.append(f"{name}: p95 {before['latency_ms']['p95']} ms -> {result['latency_ms']['p95']} ms")
+    return regressions
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--mongomock", action="store_true", help="use mongomock-motor instead of a mongod")
+    parser.add_argument("--grades", type=int, default=6)
+    parser.add_argument("--topics-per-grade", type=int, default=40)
+    parser.add_argument("--modules-per-topic", type=int, default=10)
+    parser.add_argument("--quiz-questions", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--accept-encoding", default="gzip, br")
+    parser.add_argument("--only", nargs="*", help="run only these scenarios")
+    parser.add_argument("--output", type=Path, default=Path("bench_results.json"))
+    parser.add_argument("--baseline", type=Path)
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args()
+
+    db_name = f"bench_{uuid.uuid4().hex[:8]}"
+    os.environ["MONGO_URL"] = args.mongo_url
+    os.environ["DB_NAME"] = db_name
+
+    import httpx
+    import server
+    from curriculum_import import import_curriculum
+
+    if args.mongomock:
+        from mongomock_motor import AsyncMongoMockClient
+
+        server.client = AsyncMongoMockClient()
+        server.db = server.secondary_db = server.user_db = server.client[db_name]
+        import_client = None
+    else:
+        import_client = server.client
+
+    async def records():
+        for record in synthetic_records(args.grades, args.topics_per_grade, args.modules_per_topic, args.quiz_questions):
+            yield record
+
+    started = time.perf_counter()
+    importer = await import_curriculum(server.db, records(), client=import_client)
+    seed_seconds = time.perf_counter() - started
+    print(f"Seeded {json.dumps({k: v['records'] for k, v in importer.stats.items()})} in {seed_seconds:.1f}s")
+
+    # Spread progress over a class worth of users so per-user rate limits don't kick in
+    users = await server.db.users.insert_many(
+        [{"name": f"Estudiante {i}", "current_grade": 7, "progress": {}} for i in range(1000)])
+    user_ids = [str(user_id) for user_id in users.inserted_ids]
+
+    for handler in server.app.router.on_startup:
+        await handler()
+
+    report = {
+        "created_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "backend": "mongomock" if args.mongomock else "mongod",
+        "scale": {k: v["records"] for k, v in importer.stats.items()},
+        "seed_seconds": round(seed_seconds, 2),
+        "concurrency": args.concurrency,
+        "scenarios": {},
+    }
+    headers = {"Accept-Encoding": args.accept_encoding}
+    try:
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+            for name, method, make_url, make_body in build_scenarios(server, user_ids):
+                if args.only and name not in args.only:
+                    continue
+                result = await run_scenario(http, method, make_url, make_body, args.requests, args.concurrency, headers)
+                report["scenarios"][name] = result
+                print(f"{name:30} {result['throughput_rps']:>9} req/s  p50 {result['latency_ms']['p50']:>8} ms  "
+                      f"p95 {result['latency_ms']['p95']:>8} ms  p99 {result['latency_ms']['p99']:>8} ms  "
+                      f"errors {result['errors']}")
+    finally:
+        if not args.mongomock:
+            await server.client.drop_database(db_name)
+        for handler in server.app.router.on_shutdown:
+            await handler()
+
+    args.output.write_text(json.dumps(report, indent=2))
+    print(f"Report written to {args.output}")
+
+    if args.baseline:
+        regressions = compare(report, json.loads(args.baseline.read_text()), args.max_regression)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,152 @@
+"""Start a local three-member replica set and check that read load spreads across its secondaries.
+
+Needs a mongod binary on PATH (or pass --mongod). Run from the backend directory:
+
+    python benchmarks/replica_set.py
+
+    # arguments after -- go to load_test.py
+    python benchmarks/replica_set.py -- --requests 5000 --only content_page leaderboard
+
+The members' opcounters are read before and after load_test.py runs against the
+replica set. The run fails when the secondaries served less than
+--min-secondary-share of the queries (finds; getmores are left out because
+oplog replication issues them too).
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from pymongo import MongoClient
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPLICA_SET = "rs_bench"
+# Scenarios whose requests reach MongoDB rather than the in-memory snapshots
+DEFAULT_LOAD_ARGS = ["--only", "content_page", "topic_progress", "leaderboard", "progress"]
+# Only initial finds: the primary's getmore counter also counts the secondaries
+# tailing its oplog, which would inflate the primary's share
+READ_OPS = ("query",)
+WRITE_OPS = ("insert", "update", "delete")
+
+
+def member(port: int) -> MongoClient:
+    return MongoClient("127.0.0.1", port, directConnection=True, serverSelectionTimeoutMS=1000)
+
+
+def wait_for(check, timeout: float, what: str):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if check():
+                return
+        except Exception:
+            pass
+        time.sleep(0.5)
+    raise SystemExit(f"Timed out waiting for {what}")
+
+
+def start_members(mongod: str, ports, root: Path):
+    processes = []
+    for port in ports:
+        path = root / str(port)
+        path.mkdir()
+        processes.append(subprocess.Popen(
+            [mongod, "--replSet", REPLICA_SET, "--port", str(port), "--bind_ip", "127.0.0.1",
+             "--dbpath", str(path), "--oplogSize", "128", "--logpath", str(path / "mongod.log")],
+            stdout=subprocess.DEVNULL,
+        ))
+    return processes
+
+
+def ping(port: int) -> bool:
+    with member(port) as client:
+        return client.admin.command("ping")["ok"] == 1
+
+
+def initiate(ports, timeout: float):
+    for port in ports:
+        wait_for(lambda: ping(port), timeout, f"mongod on port {port}")
+    config = {
+        "_id": REPLICA_SET,
+        # The first member wins the election, so the primary's port is predictable
+        "members": [{"_id": i, "host": f"127.0.0.1:{port}", "priority": 2 if i == 0 else 1} for i, port in enumerate(ports)],
+    }
+    with member(ports[0]) as client:
+        client.admin.command("replSetInitiate", config)
+
+    def ready():
+        with member(ports[0]) as client:
+            states = [m["stateStr"] for m in client.admin.command("replSetGetStatus")["members"]]
+        return states.count("PRIMARY") == 1 and states.count("SECONDARY") == len(ports) - 1
+
+    wait_for(ready, timeout, "a primary and two secondaries")
+
+
+def opcounters(ports):
+    counters = {}
+    for port in ports:
+        with member(port) as client:
+            hello = client.admin.command("hello")
+            # Replicated writes are counted in opcountersRepl, so these are the member's own clients
+            ops = client.admin.command("serverStatus")["opcounters"]
+        counters[port] = {"role": "primary" if hello.get("isWritablePrimary") else "secondary", **ops}
+    return counters
+
+
+def report(before, after, min_share: float) -> bool:
+    reads = {port: sum(after[port][op] - before[port][op] for op in READ_OPS) for port in after}
+    writes = {port: sum(after[port][op] - before[port][op] for op in WRITE_OPS) for port in after}
+    total = sum(reads.values())
+    secondary = sum(reads[port] for port in after if after[port]["role"] == "secondary")
+    for port in after:
+        share = reads[port] / total if total else 0.0
+        print(f"  127.0.0.1:{port}  {after[port]['role']:9}  reads {reads[port]:>8} ({share:.0%})  writes {writes[port]:>8}")
+    share = secondary / total if total else 0.0
+    print(f"Secondaries served {share:.0%} of {total} reads (minimum {min_share:.0%})")
+    return share >= min_share
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mongod", default="mongod")
+    parser.add_argument("--base-port", type=int, default=27117)
+    parser.add_argument("--timeout", type=float, default=60, help="seconds to wait for the replica set")
+    parser.add_argument("--min-secondary-share", type=float, default=0.5)
+    parser.add_argument("load_args", nargs=argparse.REMAINDER, help="arguments for load_test.py, after --")
+    args = parser.parse_args()
+
+    mongod = shutil.which(args.mongod)
+    if not mongod:
+        raise SystemExit(f"{args.mongod} not found, pass --mongod with the path to a mongod binary")
+    ports = [args.base_port + i for i in range(3)]
+    url = "mongodb://" + ",".join(f"127.0.0.1:{port}" for port in ports) + f"/?replicaSet={REPLICA_SET}"
+    load_args = [arg for arg in args.load_args if arg != "--"] or DEFAULT_LOAD_ARGS
+
+    root = Path(tempfile.mkdtemp(prefix="rs_bench_"))
+    processes = start_members(mongod, ports, root)
+    try:
+        initiate(ports, args.timeout)
+        print(f"Replica set {REPLICA_SET} ready at {url}")
+        before = opcounters(ports)
+        subprocess.run(
+            [sys.executable, str(BENCH_DIR / "load_test.py"), "--mongo-url", url, *load_args],
+            cwd=BENCH_DIR.parent, env={**os.environ, "MONGO_URL": url}, check=True,
+        )
+        after = opcounters(ports)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=30)
+        shutil.rmtree(root, ignore_errors=True)
+
+    if not report(before, after, args.min_secondary_share):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Compare per-request CPU time of the Pydantic read path and the fast read path.
+
+Run from the backend directory:
+
+    python benchmarks/serialization.py --questions 200 --iterations 500
+"""
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from bson import ObjectId
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+
+from server import Content, str_object_id, shape_document, MongoJSONResponse  # noqa: E402
+
+
+def build_quiz_document(questions: int) -> dict:
+    return {
+        "_id": ObjectId(),
+        "module_id": str(ObjectId()),
+        "content_type": "quiz",
+        "title": "Quiz - Benchmark",
+        "quiz_questions": [
+            {
+                "question": f"Pregunta {i}: ¿Cuál es el valor de |-{i}|?",
+                "options": [
+                    {"option_text": f"-{i}", "is_correct": False},
+                    {"option_text": f"{i}", "is_correct": True},
+                    {"option_text": "0", "is_correct": False},
+                    {"option_text": f"{2 * i}", "is_correct": False},
+                ],
+                "explanation": f"El valor absoluto de -{i} es {i}, su distancia al cero.",
+            }
+            for i in range(questions)
+        ],
+        "content_hash": "benchmark",
+        "created_at": datetime.utcnow(),
+    }
+
+
+async def pydantic_path(doc: dict, field) -> bytes:
+    # What the handlers did before: build the model, let FastAPI validate it
+    # again through response_model, then encode with the stdlib json module
+    model = Content(**str_object_id(dict(doc)))
+    content = await serialize_response(field=field, response_content=model)
+    return JSONResponse(content).body
+
+
+async def fast_path(doc: dict, field) -> bytes:
+    return MongoJSONResponse(shape_document(doc, Content)).body
+
+
+async def measure(path, doc: dict, iterations: int) -> dict:
+    field = create_response_field(name="response", type_=Content)
+    body = await path(doc, field)
+    start = time.process_time()
+    for _ in range(iterations):
+        await path(doc, field)
+    elapsed = time.process_time() - start
+    return {"cpu_ms_per_request": elapsed / iterations * 1000, "bytes": len(body)}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+
+    doc = build_quiz_document(args.questions)
+    current = await measure(pydantic_path, doc, args.iterations)
+    fast = await measure(fast_path, doc, args.iterations)
+
+    print(f"Quiz document with {args.questions} questions, {args.iterations} iterations")
+    print(f"  pydantic path: {current['cpu_ms_per_request']:.3f} ms/request ({current['bytes']} bytes)")
+    print(f"  fast path:     {fast['cpu_ms_per_request']:.3f} ms/request ({fast['bytes']} bytes)")
+    print(f"  speedup:       {current['cpu_ms_per_request'] / fast['cpu_ms_per_request']:.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
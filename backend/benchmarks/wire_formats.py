@@ -0,0 +1,81 @@
+"""Compare payload size and encode time of JSON and MessagePack for the largest 7th-grade modules.
+
+Run from the backend directory:
+
+    python benchmarks/wire_formats.py --modules 5 --iterations 500
+"""
+import argparse
+import gzip
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import orjson
+from bson import ObjectId
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from curriculum_import import iter_json_records  # noqa: E402
+from server import SEED_DIR, SNAPSHOT_BROTLI_QUALITY, encode_msgpack, json_default, public_content  # noqa: E402
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def seed_modules():
+    """Public content of every module in the seed curriculum, as served by /modules/{id}/content"""
+    modules = {}
+    for record in iter_json_records(orjson.loads((SEED_DIR / "curriculum.json").read_bytes())):
+        if record["type"] != "content":
+            continue
+        key = (record["grade_number"], record["topic_order"], record["module_order"])
+        doc = {k: v for k, v in record.items() if k not in ("type", "grade_number", "topic_order", "module_order")}
+        doc.update({"_id": ObjectId(), "module_id": str(ObjectId()), "created_at": datetime.utcnow()})
+        modules.setdefault(key, []).append(public_content(doc))
+    return modules
+
+
+def encoders():
+    return {
+        "json": lambda payload: orjson.dumps(payload, default=json_default, option=orjson.OPT_NON_STR_KEYS),
+        "msgpack": lambda payload: encode_msgpack(payload, "msgpack"),
+        "msgpack-columnar": lambda payload: encode_msgpack(payload, "msgpack-columnar"),
+    }
+
+
+def measure(encode, payload, iterations: int) -> dict:
+    body = encode(payload)
+    start = time.process_time()
+    for _ in range(iterations):
+        encode(payload)
+    elapsed = time.process_time() - start
+    result = {"encode_us": elapsed / iterations * 1e6, "bytes": len(body), "gzip": len(gzip.compress(body, 6))}
+    if brotli:
+        result["br"] = len(brotli.compress(body, quality=SNAPSHOT_BROTLI_QUALITY))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modules", type=int, default=5, help="how many of the largest modules to measure")
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+
+    modules = seed_modules()
+    encode_json = encoders()["json"]
+    largest = sorted(modules.items(), key=lambda item: len(encode_json(item[1])), reverse=True)[:args.modules]
+    for (grade, topic, module), payload in largest:
+        print(f"Grade {grade}, topic {topic}, module {module}: {len(payload)} content documents")
+        results = {name: measure(encode, payload, args.iterations) for name, encode in encoders().items()}
+        baseline = results["json"]["bytes"]
+        for name, result in results.items():
+            compressed = f"gzip {result['gzip']:>7}" + (f"  br {result['br']:>7}" if "br" in result else "")
+            print(f"  {name:17} {result['encode_us']:>9.1f} us  {result['bytes']:>8} bytes "
+                  f"({result['bytes'] / baseline:.0%})  {compressed}")
+
+
+if __name__ == "__main__":
+    main()
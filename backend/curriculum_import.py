@@ -0,0 +1,358 @@
+"""Bulk, idempotent curriculum importer.
+
+Curriculum files are either JSON (a nested {"grades": [...]} tree, or a list of
+records) or NDJSON with one record per line. A record looks like:
+
+    {"type": "grade", "grade_number": 7, "grade_name": "7mo Grado", ...}
+    {"type": "topic", "grade_number": 7, "order": 1, "name": "...", ...}
+    {"type": "module", "grade_number": 7, "topic_order": 1, "order": 1, ...}
+    {"type": "content", "grade_number": 7, "topic_order": 1, "module_order": 1,
+     "content_type": "quiz", ...}
+
+Records are upserted in batched bulk_write calls keyed on these natural keys,
+so importing the same file twice leaves the database unchanged. A grade record
+holding only grade_number is a reference to an existing grade.
+
+Usage (from the backend directory):
+
+    python curriculum_import.py seed/curriculum.json --prune
+"""
+import asyncio
+import hashlib
+import json
+import os
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+from pymongo import ReturnDocument, UpdateOne
+
+LEVELS = ["grade", "topic", "module", "content"]
+COLLECTIONS = {"grade": "grades", "topic": "topics", "module": "modules", "content": "content"}
+CHILDREN = {"grade": "topics", "topic": "modules", "module": "content"}
+
+# Natural key fields of each record type, parent keys first
+NATURAL_KEYS = {
+    "grade": ("grade_number",),
+    "topic": ("grade_number", "order"),
+    "module": ("grade_number", "topic_order", "order"),
+    "content": ("grade_number", "topic_order", "module_order", "content_type"),
+}
+# Field linking a document to its parent and the field that identifies it below that parent
+PARENT_FIELD = {"topic": "grade_id", "module": "topic_id", "content": "module_id"}
+LOCAL_KEY = {"grade": "grade_number", "topic": "order", "module": "order", "content": "content_type"}
+
+# Document in the meta collection whose revision is bumped by every curriculum write
+REVISION_ID = "curriculum"
+
+
+class CurriculumImportError(ValueError):
+    pass
+
+
+def record_hash(fields: Dict[str, Any]) -> str:
+    payload = json.dumps(fields, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def flatten_tree(tree: Dict[str, Any]) -> Iterable[Dict[str, Any]]:
+    """Turn a nested {"grades": [...]} document into flat records"""
+    for grade in tree.get("grades", []):
+        grade_number = grade["grade_number"]
+        yield {"type": "grade", **{k: v for k, v in grade.items() if k != "topics"}}
+        for topic in grade.get("topics", []):
+            yield {"type": "topic", "grade_number": grade_number, **{k: v for k, v in topic.items() if k != "modules"}}
+            for module in topic.get("modules", []):
+                yield {
+                    "type": "module",
+                    "grade_number": grade_number,
+                    "topic_order": topic["order"],
+                    **{k: v for k, v in module.items() if k != "content"},
+                }
+                for content in module.get("content", []):
+                    yield {
+                        "type": "content",
+                        "grade_number": grade_number,
+                        "topic_order": topic["order"],
+                        "module_order": module["order"],
+                        **content,
+                    }
+
+
+def iter_json_records(data: Any) -> Iterable[Dict[str, Any]]:
+    if isinstance(data, dict):
+        return flatten_tree(data)
+    if isinstance(data, list):
+        return data
+    raise CurriculumImportError("JSON curriculum must be an object with 'grades' or a list of records")
+
+
+async def iter_ndjson_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[Dict[str, Any]]:
+    """Parse NDJSON records as the chunks arrive, without buffering the whole body"""
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+    if pending.strip():
+        yield json.loads(pending)
+
+
+async def iter_file_records(path: Path) -> AsyncIterator[Dict[str, Any]]:
+    if path.suffix in (".ndjson", ".jsonl"):
+        with path.open("rb") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        with path.open("rb") as f:
+            for record in iter_json_records(json.load(f)):
+                yield record
+
+
+class CurriculumImporter:
+    def __init__(self, db, session=None, batch_size: int = 500, models: Optional[Dict[str, Type[BaseModel]]] = None):
+        self.db = db
+        self.session = session
+        self.batch_size = batch_size
+        # level -> pydantic model each record must satisfy before it is buffered
+        self.models: Dict[str, Type[BaseModel]] = models or {}
+        self.import_id = uuid.uuid4().hex
+        self.buffers: Dict[str, List[Dict[str, Any]]] = {level: [] for level in LEVELS}
+        # natural key -> document id
+        self.ids: Dict[str, Dict[Tuple, str]] = {level: {} for level in LEVELS}
+        self.stats = {level: {"records": 0, "inserted": 0, "matched": 0} for level in LEVELS}
+        self.touched_modules: set = set()
+        self.pruned = {level: 0 for level in LEVELS[1:]}
+        self.revision: Optional[int] = None
+
+    async def add(self, record: Dict[str, Any]):
+        level = record.get("type")
+        if level not in NATURAL_KEYS:
+            raise CurriculumImportError(f"Unknown record type: {level!r}")
+        missing = [k for k in NATURAL_KEYS[level] if k not in record]
+        if missing:
+            raise CurriculumImportError(f"{level} record is missing {', '.join(missing)}")
+        self._validate(level, record)
+        self.buffers[level].append(record)
+        self.stats[level]["records"] += 1
+        if len(self.buffers[level]) >= self.batch_size:
+            await self.flush(level)
+
+    async def flush(self, level: str):
+        # Parents are written first so children can be linked to their ids
+        for parent in LEVELS[:LEVELS.index(level) + 1]:
+            await self._flush_level(parent)
+
+    async def finish(self, prune: bool = False):
+        await self.flush(LEVELS[-1])
+        if prune:
+            await self._prune()
+
+    def _key(self, level: str, record: Dict[str, Any]) -> Tuple:
+        return tuple(record[k] for k in NATURAL_KEYS[level])
+
+    def _fields(self, level: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        """The document fields a record writes, without its parent id"""
+        fields = {k: v for k, v in record.items() if k not in NATURAL_KEYS[level] and k not in ("type", CHILDREN.get(level))}
+        fields[LOCAL_KEY[level]] = record[NATURAL_KEYS[level][-1]]
+        return fields
+
+    def _validate(self, level: str, record: Dict[str, Any]):
+        model = self.models.get(level)
+        fields = self._fields(level, record)
+        if model is None or (level == "grade" and len(fields) == 1):
+            return
+        # The parent id is only known once the parent is written; any string stands in for it
+        if level in PARENT_FIELD:
+            fields[PARENT_FIELD[level]] = ""
+        try:
+            model.model_validate(fields)
+        except ValidationError as e:
+            error = e.errors()[0]
+            where = ".".join(map(str, error["loc"]))
+            raise CurriculumImportError(
+                f"{level} {'/'.join(map(str, self._key(level, record)))} is invalid: {where}: {error['msg']}"
+            )
+
+    async def _resolve(self, level: str, key: Tuple) -> str:
+        """Id of an already written document, looked up in Mongo if it came from an earlier import"""
+        if key in self.ids[level]:
+            return self.ids[level][key]
+        query = {LOCAL_KEY[level]: key[-1]}
+        if level != "grade":
+            query[PARENT_FIELD[level]] = await self._resolve(LEVELS[LEVELS.index(level) - 1], key[:-1])
+        doc = await self.db[COLLECTIONS[level]].find_one(query, {"_id": 1}, session=self.session)
+        if not doc:
+            raise CurriculumImportError(f"{level} {'/'.join(map(str, key))} not found")
+        self.ids[level][key] = str(doc["_id"])
+        return self.ids[level][key]
+
+    async def _flush_level(self, level: str):
+        records, self.buffers[level] = self.buffers[level], []
+        if not records:
+            return
+
+        now = datetime.utcnow()
+        updates: List[Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]] = []
+        ops, filters, keys = [], [], []
+        for record in records:
+            key = self._key(level, record)
+            fields = self._fields(level, record)
+            if level != "grade":
+                fields[PARENT_FIELD[level]] = await self._resolve(LEVELS[LEVELS.index(level) - 1], key[:-1])
+            elif len(fields) == 1:
+                # Reference-only grade record
+                await self._resolve(level, key)
+                continue
+
+            doc_filter = {k: fields[k] for k in (PARENT_FIELD.get(level), LOCAL_KEY[level]) if k}
+            on_insert: Dict[str, Any] = {"created_at": now}
+            if level == "content":
+                fields["content_hash"] = record_hash(fields)
+                self.touched_modules.add(fields["module_id"])
+            elif "is_active" not in fields:
+                on_insert["is_active"] = True
+
+            updates.append((doc_filter, fields, on_insert))
+            filters.append(doc_filter)
+            keys.append(key)
+
+        if not updates:
+            return
+        collection = self.db[COLLECTIONS[level]]
+        changed = await self._changed(collection, level, updates)
+        for (doc_filter, fields, on_insert), is_changed in zip(updates, changed):
+            # updated_at moves only when the written fields differ, so it can serve as Last-Modified
+            update_fields = {**fields, "import_id": self.import_id, **({"updated_at": now} if is_changed else {})}
+            ops.append(UpdateOne(doc_filter, {"$set": update_fields, "$setOnInsert": on_insert}, upsert=True))
+        result = await collection.bulk_write(ops, ordered=False, session=self.session)
+        self.stats[level]["inserted"] += result.upserted_count
+        self.stats[level]["matched"] += result.matched_count
+
+        if level == "content":
+            return
+        # Map natural keys to ids for the children that follow
+        key_by_filter = {tuple(sorted(f.items())): k for f, k in zip(filters, keys)}
+        projection = {"_id": 1, **{k: 1 for k in filters[0]}}
+        async for doc in collection.find({"$or": filters}, projection, session=self.session):
+            doc_filter = tuple(sorted((k, doc[k]) for k in filters[0]))
+            if doc_filter in key_by_filter:
+                self.ids[level][key_by_filter[doc_filter]] = str(doc["_id"])
+
+    async def _changed(self, collection, level: str, updates) -> List[bool]:
+        """Whether each update writes new values: a new document, or fields (the content hash) that differ"""
+        compared = ["content_hash"] if level == "content" else sorted({k for _, fields, _ in updates for k in fields})
+        filter_keys = list(updates[0][0])
+        projection = {"_id": 0, **{k: 1 for k in filter_keys + compared}}
+        existing = {}
+        async for doc in collection.find({"$or": [f for f, _, _ in updates]}, projection, session=self.session):
+            existing[tuple(doc.get(k) for k in filter_keys)] = doc
+        changed = []
+        for doc_filter, fields, _ in updates:
+            doc = existing.get(tuple(doc_filter[k] for k in filter_keys))
+            changed.append(doc is None or any(doc.get(k) != fields[k] for k in compared if k in fields))
+        return changed
+
+    async def _prune(self):
+        """Remove topics, modules and content under the imported grades that this import did not write"""
+        grade_ids = list(self.ids["grade"].values())
+        stale = {"import_id": {"$ne": self.import_id}}
+        topic_ids = [str(t["_id"]) async for t in self.db.topics.find({"grade_id": {"$in": grade_ids}}, {"_id": 1}, session=self.session)]
+        module_ids = [str(m["_id"]) async for m in self.db.modules.find({"topic_id": {"$in": topic_ids}}, {"_id": 1}, session=self.session)]
+        self.touched_modules.update(module_ids)
+
+        for level, parent_field, parent_ids in (
+            ("content", "module_id", module_ids),
+            ("module", "topic_id", topic_ids),
+            ("topic", "grade_id", grade_ids),
+        ):
+            result = await self.db[COLLECTIONS[level]].delete_many({parent_field: {"$in": parent_ids}, **stale}, session=self.session)
+            self.pruned[level] = result.deleted_count
+
+    def summary(self):
+        return {"import_id": self.import_id, "stats": self.stats, "pruned": self.pruned, "revision": self.revision}
+
+
+async def bump_revision(db, module_ids: Optional[Iterable[str]] = None, session=None) -> int:
+    """Record a curriculum change so every server process reloads it.
+
+    module_ids lists the modules whose content changed; None means everything.
+    """
+    doc = await db.meta.find_one_and_update(
+        {"_id": REVISION_ID},
+        {
+            "$inc": {"revision": 1},
+            "$set": {"modules": sorted(module_ids) if module_ids is not None else None, "updated_at": datetime.utcnow()},
+        },
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+        session=session,
+    )
+    return doc["revision"]
+
+
+async def supports_transactions(client) -> bool:
+    hello = await client.admin.command("hello")
+    return "setName" in hello or hello.get("msg") == "isdbgrid"
+
+
+async def import_curriculum(db, records: AsyncIterator[Dict[str, Any]], client=None, prune: bool = False,
+                            batch_size: int = 500, models: Optional[Dict[str, Type[BaseModel]]] = None) -> CurriculumImporter:
+    """Import records, inside a transaction when the deployment supports one.
+
+    Standalone servers have no transactions; the upserts then apply in place,
+    which never leaves readers with an empty curriculum and can be re-run safely.
+    `models` maps each record type to the pydantic model its documents are served with.
+    """
+    async def run(session=None):
+        importer = CurriculumImporter(db, session=session, batch_size=batch_size, models=models)
+        async for record in records:
+            await importer.add(record)
+        await importer.finish(prune=prune)
+        importer.revision = await bump_revision(db, importer.touched_modules, session=session)
+        return importer
+
+    if client is not None and await supports_transactions(client):
+        async with await client.start_session() as session:
+            async with session.start_transaction():
+                return await run(session)
+    return await run()
+
+
+def main(
+    path: Path,
+    prune: bool = False,
+    batch_size: int = 500,
+    mongo_url: Optional[str] = None,
+    db_name: Optional[str] = None,
+):
+    """Import a JSON or NDJSON curriculum file into MongoDB"""
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    from server import RECORD_MODELS
+
+    async def run():
+        client = AsyncIOMotorClient(mongo_url or os.environ['MONGO_URL'])
+        try:
+            importer = await import_curriculum(
+                client[db_name or os.environ['DB_NAME']], iter_file_records(path),
+                client=client, prune=prune, batch_size=batch_size, models=RECORD_MODELS,
+            )
+            print(json.dumps(importer.summary(), indent=2))
+        finally:
+            client.close()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    import typer
+
+    typer.run(main)
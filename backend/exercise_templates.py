@@ -0,0 +1,242 @@
+"""Parametric exercise templates for the integer modules.
+
+A template draws the numbers of a whole batch at once with NumPy and computes
+answers and distractors as array operations; only the problem, option and
+explanation strings are formatted per item. Generation is deterministic in
+(template, seed), so a generated set is identified by those two values and
+regenerated, chunk by chunk, instead of stored in the `content` collection.
+"""
+import zlib
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+DIFFICULTIES = ("easy", "medium", "hard")
+
+# Largest absolute value drawn at each difficulty
+OPERAND_LIMITS = np.array([10, 50, 200])
+FACTOR_LIMITS = np.array([10, 15, 30])
+
+OPTIONS = 4
+# Near misses appended to every row of candidates, so three distinct distractors always exist
+FALLBACK_OFFSETS = np.array([1, -1, 2, -2, 10])
+
+# problems, answers, distractor candidates (n, k), explanations
+Batch = Tuple[List[str], np.ndarray, np.ndarray, List[str]]
+
+
+def _signed(rng: np.random.Generator, limits: np.ndarray, nonzero: bool = False) -> np.ndarray:
+    magnitude = rng.integers(1 if nonzero else 0, limits + 1)
+    return np.where(rng.random(len(limits)) < 0.5, -magnitude, magnitude)
+
+
+def _paren(x: int) -> str:
+    return f"({x})" if x < 0 else str(x)
+
+
+def addition_subtraction(rng: np.random.Generator, levels: np.ndarray) -> Batch:
+    limits = OPERAND_LIMITS[levels]
+    a, b = _signed(rng, limits), _signed(rng, limits)
+    subtract = rng.random(len(levels)) < 0.5
+    answers = np.where(subtract, a - b, a + b)
+    candidates = np.column_stack([
+        np.where(subtract, a + b, a - b),  # wrong operation
+        -answers,  # sign of the result
+        np.where(subtract, a - np.abs(b), a + np.abs(b)),  # sign of the second operand ignored
+    ])
+
+    problems, explanations = [], []
+    for x, y, sub, result in zip(a.tolist(), b.tolist(), subtract.tolist(), answers.tolist()):
+        if sub:
+            problems.append(f"¿Cuánto es {x} - {_paren(y)}?")
+            explanations.append(f"Restar es sumar el opuesto: {x} - {_paren(y)} = {x} + {_paren(-y)} = {result}")
+        else:
+            problems.append(f"¿Cuánto es {x} + {_paren(y)}?")
+            if x * y >= 0:
+                rule = "Con signos iguales se suman los valores absolutos y se conserva el signo"
+            else:
+                rule = "Con signos distintos se restan los valores absolutos y queda el signo del de mayor valor absoluto"
+            explanations.append(f"{rule}: {x} + {_paren(y)} = {result}")
+    return problems, answers, candidates, explanations
+
+
+def multiplication_division(rng: np.random.Generator, levels: np.ndarray) -> Batch:
+    limits = FACTOR_LIMITS[levels]
+    a, b = _signed(rng, limits, nonzero=True), _signed(rng, limits, nonzero=True)
+    divide = rng.random(len(levels)) < 0.5
+    product = a * b
+    # Divisions are built from a product, so the quotient is always an integer
+    answers = np.where(divide, a, product)
+    candidates = np.column_stack([
+        -answers,  # sign rule
+        np.where(divide, b, a + b),
+        np.where(divide, product, product + a),
+    ])
+
+    problems, explanations = [], []
+    rules = ("Signos distintos dan un resultado negativo", "Signos iguales dan un resultado positivo")
+    for x, y, div, p in zip(a.tolist(), b.tolist(), divide.tolist(), product.tolist()):
+        # The rule is about the operands shown: factors for a product, dividend and divisor for a quotient
+        rule = rules[((p if div else x) > 0) == (y > 0)]
+        if div:
+            problems.append(f"¿Cuánto es {p} ÷ {_paren(y)}?")
+            explanations.append(f"{rule}: {p} ÷ {_paren(y)} = {x}, porque {x} × {_paren(y)} = {p}")
+        else:
+            problems.append(f"¿Cuánto es {x} × {_paren(y)}?")
+            explanations.append(f"{rule}: {x} × {_paren(y)} = {p}")
+    return problems, answers, candidates, explanations
+
+
+def order_comparison(rng: np.random.Generator, levels: np.ndarray) -> Batch:
+    limits = OPERAND_LIMITS[levels]
+    # Distinct values from a start and positive gaps, shown in random order
+    gaps = rng.integers(1, np.maximum(limits // 4, 2)[:, None] + 1, size=(len(levels), OPTIONS - 1))
+    ordered = _signed(rng, limits)[:, None] + np.column_stack([np.zeros(len(levels), dtype=gaps.dtype), gaps.cumsum(axis=1)])
+    shown = rng.permuted(ordered, axis=1)
+    greatest = rng.random(len(levels)) < 0.5
+    answers = np.where(greatest, ordered[:, -1], ordered[:, 0])
+    candidates = np.where(greatest[:, None], ordered[:, :-1], ordered[:, 1:])
+
+    problems, explanations = [], []
+    for values, asc, great, result in zip(shown.tolist(), ordered.tolist(), greatest.tolist(), answers.tolist()):
+        listed = ", ".join(str(v) for v in values)
+        line = " < ".join(str(v) for v in asc)
+        if great:
+            problems.append(f"¿Cuál es el número mayor? {listed}")
+            explanations.append(f"En la recta numérica el mayor está más a la derecha: {line}. El mayor es {result}")
+        else:
+            problems.append(f"¿Cuál es el número menor? {listed}")
+            explanations.append(f"En la recta numérica el menor está más a la izquierda: {line}. El menor es {result}")
+    return problems, answers, candidates, explanations
+
+
+def choose_options(rng: np.random.Generator, answers: np.ndarray, candidates: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Option values (n, OPTIONS) and the column of the correct one.
+
+    Distractors are the first candidates of each row that differ from the
+    answer and from earlier candidates; the answer's position is shuffled.
+    """
+    n = len(answers)
+    candidates = np.column_stack([candidates, answers[:, None] + FALLBACK_OFFSETS])
+    repeated = np.tril(candidates[:, :, None] == candidates[:, None, :], k=-1).any(axis=2)
+    usable = ~repeated & (candidates != answers[:, None])
+    first = np.argsort(~usable, axis=1, kind="stable")[:, :OPTIONS - 1]
+    values = np.column_stack([answers, np.take_along_axis(candidates, first, axis=1)])
+    order = rng.permuted(np.tile(np.arange(OPTIONS), (n, 1)), axis=1)
+    return np.take_along_axis(values, order, axis=1), np.argmin(order, axis=1)
+
+
+class GeneratedChunk:
+    """CHUNK_SIZE generated exercises kept as arrays; dicts are only built for the items served"""
+
+    def __init__(self, problems: List[str], values: np.ndarray, correct: np.ndarray, explanations: List[str]):
+        self.problems = problems
+        self.values = values.astype(np.int32)
+        self.correct = correct.astype(np.int8)
+        self.explanations = explanations
+
+    def exercise(self, i: int, level: int) -> Dict[str, Any]:
+        right = int(self.correct[i])
+        return {
+            "problem": self.problems[i],
+            "options": [{"option_text": str(v), "is_correct": k == right} for k, v in enumerate(self.values[i].tolist())],
+            "difficulty": DIFFICULTIES[level],
+            "explanation": self.explanations[i],
+        }
+
+
+# Exercises are generated in fixed chunks, each seeded on its own, so item i of
+# a set is the same whether one page or the whole set is generated
+CHUNK_SIZE = 100
+
+
+def item_level(index: int) -> int:
+    """Difficulties cycle through the set, so a difficulty's k-th item is at index k * 3 + level"""
+    return index % len(DIFFICULTIES)
+
+
+class ExerciseTemplate:
+    def __init__(self, name: str, module_name: str, build: Callable[[np.random.Generator, np.ndarray], Batch]):
+        self.name = name
+        # Seeded module the generated exercises practice
+        self.module_name = module_name
+        self.build = build
+        self._key = zlib.crc32(name.encode())
+
+    def chunk(self, seed: int, chunk: int) -> GeneratedChunk:
+        rng = np.random.default_rng([self._key, seed, chunk])
+        levels = (chunk * CHUNK_SIZE + np.arange(CHUNK_SIZE)) % len(DIFFICULTIES)
+        problems, answers, candidates, explanations = self.build(rng, levels)
+        values, correct = choose_options(rng, answers, candidates)
+        return GeneratedChunk(problems, values, correct, explanations)
+
+    def generate(self, seed: int, count: int) -> List[Dict[str, Any]]:
+        """The first `count` exercises of a set, in the shape of `Exercise`"""
+        chunks = [self.chunk(seed, c) for c in range(-(-count // CHUNK_SIZE))]
+        return [chunks[i // CHUNK_SIZE].exercise(i % CHUNK_SIZE, item_level(i)) for i in range(count)]
+
+
+TEMPLATES = {
+    template.name: template
+    for template in (
+        ExerciseTemplate("integer_addition_subtraction", "Suma y Resta", addition_subtraction),
+        ExerciseTemplate("integer_multiplication_division", "Multiplicación y División", multiplication_division),
+        ExerciseTemplate("integer_order_comparison", "Orden y Comparación", order_comparison),
+    )
+}
+
+
+def template_for_module(module_name: str) -> Optional[ExerciseTemplate]:
+    return next((t for t in TEMPLATES.values() if t.module_name == module_name), None)
+
+
+class GeneratedSets:
+    """Generated chunks keyed by (template, seed, chunk), least recently used evicted first"""
+
+    def __init__(self, max_chunks: int):
+        self.max_chunks = max_chunks
+        self.chunks: Dict[Tuple[str, int, int], GeneratedChunk] = {}
+        self.hits = 0
+        self.misses = 0
+        self.uncached = 0
+
+    def _chunk(self, template: ExerciseTemplate, seed: int, chunk: int, cache: bool) -> GeneratedChunk:
+        if not cache:
+            self.uncached += 1
+            return template.chunk(seed, chunk)
+        key = (template.name, seed, chunk)
+        generated = self.chunks.pop(key, None)
+        if generated is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            generated = template.chunk(seed, chunk)
+        self.chunks[key] = generated
+        if len(self.chunks) > self.max_chunks:
+            del self.chunks[next(iter(self.chunks))]
+        return generated
+
+    def get(self, template: ExerciseTemplate, seed: int, indexes: Iterable[int], cache: bool = True) -> List[Dict[str, Any]]:
+        """Exercises at `indexes` of the (template, seed) set; only the chunks holding them are generated.
+
+        Pass cache=False for one-off seeds nobody will ask for again.
+        """
+        chunks: Dict[int, GeneratedChunk] = {}
+        exercises = []
+        for i in indexes:
+            c = i // CHUNK_SIZE
+            if c not in chunks:
+                chunks[c] = self._chunk(template, seed, c, cache)
+            exercises.append(chunks[c].exercise(i % CHUNK_SIZE, item_level(i)))
+        return exercises
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "chunks": len(self.chunks),
+            "chunk_size": CHUNK_SIZE,
+            "hits": self.hits,
+            "misses": self.misses,
+            "uncached": self.uncached,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,20 @@
+"""Multi-worker deployment.
+
+Run from the backend directory:
+
+    gunicorn -c gunicorn.conf.py server:app
+
+or, without gunicorn, `uvicorn server:app --workers 4 --port 8001`.
+Every worker opens its own MongoDB pool of up to MONGO_MAX_POOL_SIZE
+connections, so size that setting per worker.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:8001")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+# Give workers time to flush buffered progress on shutdown
+graceful_timeout = int(os.environ.get("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.environ.get("WORKER_TIMEOUT", "60"))
+keepalive = 5
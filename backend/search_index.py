@@ -0,0 +1,115 @@
+"""In-memory BM25 search over glossary terms, theory, exercises and quiz questions.
+
+Text is folded to lowercase ASCII before tokenizing, so "Números" and
+"numeros" are the same term. The index is kept per module, which lets a
+publish replace just the modules it touched.
+"""
+import heapq
+import math
+import re
+import unicodedata
+from typing import Any, Dict, Iterable, List, Tuple
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+SPANISH_STOPWORDS = frozenset("""
+a al algo ante antes como con cual cuando de del desde donde dos e el ella en entre era es esa ese
+esta este esto estos fue ha hay la las le les lo los mas me mi muy no o para pero por que se si sin
+sobre son su sus tambien te tiene un una uno unos y ya
+""".split())
+
+
+def fold(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_RE.findall(fold(text)) if token not in SPANISH_STOPWORDS]
+
+
+def content_entries(doc: Dict[str, Any]) -> Iterable[Tuple[str, int, str, str]]:
+    """(field, item_index, label, text) for every searchable part of a content document"""
+    for i, term in enumerate(doc.get("glossary_terms") or []):
+        yield "glossary_term", i, term["term"], f"{term['term']} {term['definition']} {term.get('example') or ''}"
+    if doc.get("theory_content"):
+        yield "theory", 0, doc.get("title", ""), doc["theory_content"]
+    for i, exercise in enumerate(doc.get("exercises") or []):
+        yield "exercise", i, exercise["problem"], exercise["problem"]
+    for i, question in enumerate(doc.get("quiz_questions") or []):
+        yield "quiz_question", i, question["question"], question["question"]
+
+
+class SearchIndex:
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.entries: Dict[int, Dict[str, Any]] = {}
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.module_entries: Dict[str, List[int]] = {}
+        self.total_length = 0
+        self._next_id = 0
+
+    def replace_module(self, module_id: str, docs: List[Dict[str, Any]]):
+        self.remove_module(module_id)
+        entry_ids = []
+        for doc in docs:
+            for field, item_index, label, text in content_entries(doc):
+                tokens = tokenize(text)
+                if not tokens:
+                    continue
+                entry_id = self._next_id
+                self._next_id += 1
+                counts: Dict[str, int] = {}
+                for token in tokens:
+                    counts[token] = counts.get(token, 0) + 1
+                for token, tf in counts.items():
+                    self.postings.setdefault(token, {})[entry_id] = tf
+                self.entries[entry_id] = {
+                    "module_id": module_id,
+                    "content_type": doc["content_type"],
+                    "field": field,
+                    "item_index": item_index,
+                    "label": label,
+                    "length": len(tokens),
+                    "terms": list(counts),
+                }
+                self.total_length += len(tokens)
+                entry_ids.append(entry_id)
+        if entry_ids:
+            self.module_entries[module_id] = entry_ids
+
+    def remove_module(self, module_id: str):
+        for entry_id in self.module_entries.pop(module_id, []):
+            entry = self.entries.pop(entry_id)
+            self.total_length -= entry["length"]
+            for term in entry["terms"]:
+                postings = self.postings[term]
+                del postings[entry_id]
+                if not postings:
+                    del self.postings[term]
+
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        terms = set(tokenize(query))
+        n = len(self.entries)
+        if not terms or not n:
+            return []
+        avg_length = self.total_length / n
+        scores: Dict[int, float] = {}
+        for term in terms:
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for entry_id, tf in postings.items():
+                length_norm = 1 - self.b + self.b * self.entries[entry_id]["length"] / avg_length
+                scores[entry_id] = scores.get(entry_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + self.k1 * length_norm)
+
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [
+            {**{k: v for k, v in self.entries[entry_id].items() if k not in ("terms", "length")}, "score": round(score, 4)}
+            for entry_id, score in best
+        ]
+
+    def stats(self):
+        return {"entries": len(self.entries), "terms": len(self.postings), "modules": len(self.module_entries)}
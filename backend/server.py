@@ -1,30 +1,296 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne, WriteConcern, monitoring
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from pymongo.read_concern import ReadConcern
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional, Dict, Any, Annotated
+from typing import List, Optional, Dict, Any, Annotated, AsyncIterator, Union, Literal
 import uuid
-from datetime import datetime
+import asyncio
+import hashlib
+import hmac
+import json
+import math
+import random
+import orjson
+import gzip
+import threading
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
 from bson import ObjectId
+from search_index import SearchIndex
+from summaries import TOPIC_COUNTERS, rebuild_summaries, write_summaries
+from exercise_templates import DIFFICULTIES, TEMPLATES, GeneratedSets, template_for_module
+import analytics
+import pandas as pd
+from curriculum_import import (
+    REVISION_ID,
+    CurriculumImportError,
+    bump_revision,
+    import_curriculum,
+    iter_json_records,
+    iter_ndjson_chunks,
+    supports_transactions,
+)
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, snapshots fall back to gzip only
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional, clients asking for it get JSON
+    msgpack = None
 
 ROOT_DIR = Path(__file__).parent
+SEED_DIR = ROOT_DIR / 'seed'
 load_dotenv(ROOT_DIR / '.env')
 
+# Connection pool metrics from pymongo's CMAP events. Listeners run on the
+# driver's worker threads, so counters are guarded by a lock.
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.open_connections = 0
+        self.in_use = 0
+        self.max_in_use = 0
+        self.waiting = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+        with self._lock:
+            self.waiting += 1
+
+    def connection_checked_out(self, event):
+        waited = time.perf_counter() - getattr(self._local, "started", time.perf_counter())
+        with self._lock:
+            self.waiting -= 1
+            self.in_use += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.waiting -= 1
+            self.checkout_failures += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use -= 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections -= 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_pool_size": MONGO_POOL_OPTIONS["maxPoolSize"],
+                "min_pool_size": MONGO_POOL_OPTIONS["minPoolSize"],
+                "open_connections": self.open_connections,
+                "in_use": self.in_use,
+                "max_in_use": self.max_in_use,
+                "waiting": self.waiting,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "avg_wait_ms": self.wait_seconds_total / self.checkouts * 1000 if self.checkouts else 0.0,
+                "max_wait_ms": self.wait_seconds_max * 1000,
+            }
+
+# Prometheus-style latency histograms, rendered by hand in the text exposition format
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class LatencyHistogram:
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        index = next((i for i, bound in enumerate(LATENCY_BUCKETS) if seconds <= bound), len(LATENCY_BUCKETS))
+        self.counts[index] += 1
+        self.total += seconds
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimate by linear interpolation inside the bucket holding the q-th observation"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = LATENCY_BUCKETS[i - 1] if i > 0 else 0.0
+                upper = LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else LATENCY_BUCKETS[-1]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return LATENCY_BUCKETS[-1]
+
+    def exposition(self, name: str, labels: str) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(LATENCY_BUCKETS + ("+Inf",), self.counts):
+            cumulative += bucket_count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {self.total}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms: Dict[str, Dict[tuple, LatencyHistogram]] = {}
+        self.counters: Dict[str, Dict[tuple, int]] = {}
+
+    def observe(self, name: str, labels: tuple, seconds: float):
+        with self._lock:
+            self.histograms.setdefault(name, {}).setdefault(labels, LatencyHistogram()).observe(seconds)
+
+    def inc(self, name: str, labels: tuple, amount: int = 1):
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[labels] = series.get(labels, 0) + amount
+
+    def exposition(self) -> str:
+        with self._lock:
+            lines = []
+            for name, series in self.counters.items():
+                lines.append(f"# TYPE {name} counter")
+                lines.extend(f"{name}{{{format_labels(labels)}}} {value}" for labels, value in series.items())
+            for name, series in self.histograms.items():
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in series.items():
+                    lines.extend(histogram.exposition(name, format_labels(labels)))
+                lines.append(f"# TYPE {name}_quantile gauge")
+                for labels, histogram in series.items():
+                    for q in (0.5, 0.95, 0.99):
+                        lines.append(f'{name}_quantile{{{format_labels(labels)},quantile="{q}"}} {histogram.quantile(q)}')
+            return "\n".join(lines) + "\n"
+
+def format_labels(labels: tuple) -> str:
+    return ",".join(f'{key}="{value}"' for key, value in labels)
+
+metrics = MetricsRegistry()
+
+# Per-collection Mongo command durations
+class CommandMetrics(monitoring.CommandListener):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._collections: Dict[int, str] = {}
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        with self._lock:
+            self._collections[event.request_id] = collection if isinstance(collection, str) else ""
+
+    def _finish(self, event, outcome: str):
+        with self._lock:
+            collection = self._collections.pop(event.request_id, "")
+        labels = (("command", event.command_name), ("collection", collection))
+        metrics.observe("mongo_command_duration_seconds", labels, event.duration_micros / 1e6)
+        server = "{}:{}".format(*event.connection_id)
+        metrics.inc("mongo_commands_total", labels + (("server", server), ("outcome", outcome)))
+
+    def succeeded(self, event):
+        self._finish(event, "success")
+
+    def failed(self, event):
+        self._finish(event, "failure")
+
+command_metrics = CommandMetrics()
+
 # MongoDB connection
+MONGO_POOL_OPTIONS = {
+    "maxPoolSize": int(os.environ.get('MONGO_MAX_POOL_SIZE', '100')),
+    "minPoolSize": int(os.environ.get('MONGO_MIN_POOL_SIZE', '10')),
+    "maxIdleTimeMS": int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', '300000')),
+    "connectTimeoutMS": int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', '5000')),
+    "serverSelectionTimeoutMS": int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000')),
+    "waitQueueTimeoutMS": int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', '2000')),
+}
+pool_metrics = PoolMetrics()
+
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+
+# Read preferences per kind of read. Curriculum content changes only through
+# imports, and class dashboards and analytics tolerate a few seconds of lag, so
+# those reads may go to secondaries no more than MONGO_MAX_STALENESS_SECONDS
+# behind. User reads stay on the primary by default (see UserSessions)
+READ_PREFERENCE_MODES = {
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+MAX_STALENESS_SECONDS = int(os.environ.get('MONGO_MAX_STALENESS_SECONDS', '90'))
+
+def read_preference(mode: str):
+    if mode == "primary":
+        return Primary()
+    return READ_PREFERENCE_MODES[mode](max_staleness=MAX_STALENESS_SECONDS)
+
+SECONDARY_READ_PREFERENCE = read_preference(os.environ.get('SECONDARY_READ_PREFERENCE', 'secondaryPreferred'))
+USER_READ_PREFERENCE = read_preference(os.environ.get('USER_READ_PREFERENCE', 'primary'))
+
+def connect():
+    # A Motor client must not cross a fork, so each worker process builds its own
+    global client, db, secondary_db, user_db, client_pid
+    client = AsyncIOMotorClient(mongo_url, event_listeners=[pool_metrics, command_metrics], **MONGO_POOL_OPTIONS)
+    # Writes, and reads that must see the latest import (cache reloads, change streams, jobs)
+    db = client[os.environ['DB_NAME']]
+    # Curriculum fallbacks, class dashboards and analytics
+    secondary_db = client.get_database(os.environ['DB_NAME'], read_preference=SECONDARY_READ_PREFERENCE)
+    # Majority reads and writes, which causally consistent sessions need for read-your-writes on secondaries
+    user_db = client.get_database(
+        os.environ['DB_NAME'],
+        read_preference=USER_READ_PREFERENCE,
+        read_concern=ReadConcern("majority"),
+        write_concern=WriteConcern("majority"),
+    )
+    client_pid = os.getpid()
+
+connect()
 
 # Create the main app without a prefix
 app = FastAPI()
 
-# Create a router with the /api prefix
-api_router = APIRouter(prefix="/api")
-
 # Pydantic models for the educational content
 class QuizOption(BaseModel):
     option_text: str
@@ -59,6 +325,17 @@ class Content(BaseModel):
     quiz_questions: Optional[List[QuizQuestion]] = []
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+class ContentSummary(BaseModel):
+    model_config = ConfigDict(populate_by_name=True, arbitrary_types_allowed=True)
+    
+    id: Optional[str] = Field(default=None, alias="_id")
+    module_id: str
+    content_type: str
+    title: str
+    glossary_count: int = 0
+    exercise_count: int = 0
+    question_count: int = 0
+
 class Module(BaseModel):
     model_config = ConfigDict(populate_by_name=True, arbitrary_types_allowed=True)
     
@@ -92,6 +369,16 @@ class Grade(BaseModel):
     is_active: bool = True
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+# Models every imported record is checked against before it is written
+RECORD_MODELS = {"grade": Grade, "topic": Topic, "module": Module, "content": Content}
+
+# Nested curriculum tree returned by the /tree endpoints
+class TopicTree(Topic):
+    modules: List[Module] = []
+
+class GradeTree(Grade):
+    topics: List[TopicTree] = []
+
 class User(BaseModel):
     model_config = ConfigDict(populate_by_name=True, arbitrary_types_allowed=True)
     
@@ -101,6 +388,50 @@ class User(BaseModel):
     progress: Dict[str, Any] = {}
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+class SeedJob(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    id: str = Field(alias="_id")
+    kind: str
+    status: Literal["running", "succeeded", "failed"]
+    records_total: int = 0
+    records_done: int = 0
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime
+    heartbeat_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+# Progress as a client reports it; the server stamps the time
+class ProgressReport(BaseModel):
+    event_type: Literal["module_viewed", "exercise_answered", "question_answered", "quiz_scored"]
+    module_id: str
+    content_type: Optional[str] = None
+    item_index: Optional[int] = Field(default=None, ge=0)  # position of the exercise or quiz question
+    selected_option: Optional[int] = Field(default=None, ge=0)
+    is_correct: Optional[bool] = None
+    score: Optional[float] = None  # quiz score between 0 and 1
+
+class ProgressEvent(ProgressReport):
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class QuizSubmission(BaseModel):
+    answers: List[Optional[int]]  # selected option index per question, None if unanswered
+    user_id: Optional[str] = None  # record the score as progress for this user
+
+class QuestionResult(BaseModel):
+    selected_option: Optional[int] = None
+    correct_option: Optional[int] = None  # None when the question has no correct option
+    is_correct: bool
+    explanation: str
+
+class QuizGrade(BaseModel):
+    module_id: str
+    correct: int
+    total: int
+    score: float
+    results: List[QuestionResult]
+
 # Helper function to convert ObjectId to string
 def str_object_id(doc):
     if doc and "_id" in doc:
@@ -110,6 +441,952 @@ def str_object_id(doc):
 def str_object_ids(docs):
     return [str_object_id(doc) for doc in docs]
 
+# Fast read path: Mongo documents are shaped like their response model and
+# encoded straight to JSON bytes, skipping Pydantic validation on the way out
+def json_default(obj):
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+# Content negotiation: GET requests sending "Accept: application/msgpack" get
+# MessagePack, and "application/msgpack; layout=columnar" also turns option
+# arrays into one array per field, so "option_text" is written once per question
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+RESPONSE_MEDIA_TYPES = {
+    "json": "application/json",
+    "msgpack": "application/msgpack",
+    "msgpack-columnar": "application/msgpack; layout=columnar",
+}
+# Format negotiated for the current request
+response_format: ContextVar[str] = ContextVar("response_format", default="json")
+
+async def negotiate_format(request: Request):
+    negotiated = "json"
+    if msgpack and request.method == "GET":
+        for item in request.headers.get("accept", "").split(","):
+            media_type, *params = [part.strip().replace(" ", "") for part in item.split(";")]
+            if media_type in MSGPACK_MEDIA_TYPES and "q=0" not in params:
+                negotiated = "msgpack-columnar" if "layout=columnar" in params else "msgpack"
+                break
+    response_format.set(negotiated)
+
+def columnar(obj):
+    if isinstance(obj, dict):
+        return {k: columnar_options(v) if k == "options" else columnar(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [columnar(v) for v in obj]
+    return obj
+
+def columnar_options(options):
+    if not isinstance(options, list) or not all(isinstance(option, dict) for option in options):
+        return columnar(options)
+    fields = list(dict.fromkeys(k for option in options for k in option))
+    return {field: [option.get(field) for option in options] for field in fields}
+
+def msgpack_default(obj):
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not MessagePack serializable")
+
+def encode_msgpack(payload, negotiated: str) -> bytes:
+    if negotiated == "msgpack-columnar":
+        payload = columnar(payload)
+    return msgpack.packb(payload, default=msgpack_default)
+
+class MongoJSONResponse(ORJSONResponse):
+    def __init__(self, content: Any, *args, **kwargs):
+        self.format = response_format.get()
+        self.media_type = RESPONSE_MEDIA_TYPES[self.format]
+        super().__init__(content, *args, **kwargs)
+        if msgpack:
+            self.headers["Vary"] = "Accept"
+
+    def render(self, content: Any) -> bytes:
+        started = time.perf_counter()
+        if self.format == "json":
+            body = orjson.dumps(content, default=json_default, option=orjson.OPT_NON_STR_KEYS)
+        else:
+            body = encode_msgpack(content, self.format)
+        metrics.observe("app_stage_duration_seconds", (("stage", "serialize"),), time.perf_counter() - started)
+        return body
+
+# Create a router with the /api prefix
+api_router = APIRouter(prefix="/api", default_response_class=MongoJSONResponse,
+                       dependencies=[Depends(negotiate_format)])
+
+def shape_document(doc, model):
+    """Keep only the model's fields, filling in defaults for missing ones"""
+    shaped = {}
+    for name, field in model.model_fields.items():
+        key = field.alias or name
+        if key in doc:
+            shaped[key] = doc[key]
+        elif not field.is_required():
+            shaped[key] = field.get_default(call_default_factory=True)
+    return shaped
+
+def fast_response(payload, response: Response):
+    return MongoJSONResponse(payload, headers=dict(response.headers))
+
+# Conditional GET helpers
+CACHE_CONTROL = "public, max-age=60, must-revalidate"
+
+def document_hash(doc):
+    payload = json.dumps(doc, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def modified_at(doc) -> Optional[datetime]:
+    """Last-Modified of a curriculum document: the importer moves updated_at whenever its fields change"""
+    return doc.get("updated_at") or doc.get("created_at")
+
+def content_hash(doc):
+    return doc.get("content_hash") or document_hash({k: v for k, v in doc.items() if k != "_id"})
+
+# Bump when the public shape of content documents changes so cached copies revalidate
+CONTENT_REPRESENTATION = "public-quiz-1"
+
+def content_etag(doc):
+    return document_hash([CONTENT_REPRESENTATION, content_hash(doc)])
+
+def public_content(doc):
+    """Content as sent to clients: quiz answers stay on the server for grading"""
+    shaped = shape_document(doc, Content)
+    if shaped.get("quiz_questions"):
+        shaped["quiz_questions"] = [
+            {**question, "options": [{"option_text": option["option_text"]} for option in question["options"]]}
+            for question in shaped["quiz_questions"]
+        ]
+    return shaped
+
+def answer_key(doc):
+    """Correct option index (None if no option is correct), option count and explanation for every question"""
+    questions = doc.get("quiz_questions") or []
+    return {
+        "correct": [next((i for i, option in enumerate(q["options"]) if option["is_correct"]), None) for q in questions],
+        "options": [len(q["options"]) for q in questions],
+        "explanations": [q.get("explanation", "") for q in questions],
+    }
+
+def validator_headers(etag: str, last_modified: Optional[datetime] = None):
+    # Each representation of a resource gets its own entity tag
+    negotiated = response_format.get()
+    if negotiated != "json":
+        etag = f"{etag}-{negotiated}"
+    headers = {"ETag": f'"{etag}"', "Cache-Control": CACHE_CONTROL}
+    if last_modified:
+        headers["Last-Modified"] = format_datetime(last_modified.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+    return headers
+
+def client_copy_is_current(request: Request, etag_header: str, last_modified: Optional[datetime] = None):
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or etag_header in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return bool(since.tzinfo) and last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
+    return False
+
+def conditional_response(request: Request, response: Response, etag: str, last_modified: Optional[datetime] = None):
+    """Set validator headers and return a 304 response if the client copy is current"""
+    headers = validator_headers(etag, last_modified)
+    response.headers.update(headers)
+    if client_copy_is_current(request, headers["ETag"], last_modified):
+        return Response(status_code=304, headers=headers)
+    return None
+
+# Compound indexes matching every query shape the API issues
+# Bundle manifests are kept this long for ?since= deltas (see GradeBundles)
+BUNDLE_MANIFEST_TTL_DAYS = int(os.environ.get('BUNDLE_MANIFEST_TTL_DAYS', '90'))
+
+COLLECTION_INDEXES = {
+    "grades": [
+        ([("is_active", 1), ("grade_number", 1)], {}),
+        ([("grade_number", 1)], {}),
+    ],
+    "topics": [
+        ([("grade_id", 1), ("is_active", 1), ("order", 1)], {}),
+    ],
+    "modules": [
+        ([("topic_id", 1), ("is_active", 1), ("order", 1)], {}),
+    ],
+    "content": [
+        ([("module_id", 1), ("content_type", 1)], {"unique": True}),
+    ],
+    "progress_events": [
+        ([("user_id", 1), ("created_at", -1)], {}),
+        ([("module_id", 1), ("event_type", 1)], {}),
+    ],
+    # Dashboard and leaderboard reads are single range scans
+    "topic_progress": [
+        ([("topic_id", 1), ("user_id", 1)], {}),
+        ([("user_id", 1), ("grade_id", 1)], {}),
+    ],
+    "grade_leaderboard": [
+        ([("grade_id", 1), ("points", -1)], {}),
+    ],
+    # Manifests of old bundle versions expire; clients that old get a full bundle
+    "bundle_manifests": [
+        ([("created_at", 1)], {"expireAfterSeconds": BUNDLE_MANIFEST_TTL_DAYS * 86400}),
+    ],
+    # At most one active seed job across all workers
+    "jobs": [
+        ([("active", 1)], {"unique": True, "partialFilterExpression": {"active": True}}),
+    ],
+}
+
+# The (collection, filter, sort) shapes the API and the importer issue, checked
+# by /api/indexes/check. Hierarchy reads come from the curriculum cache, which
+# loads whole collections, so grades, topics and modules only appear as the
+# importer's natural key lookups
+NO_ID = "000000000000000000000000"
+INDEXED_QUERIES = [
+    ("grades", {"grade_number": 7}, None),
+    ("topics", {"grade_id": NO_ID, "order": 1}, None),
+    ("topics", {"grade_id": {"$in": [NO_ID]}}, None),
+    ("modules", {"topic_id": NO_ID, "order": 1}, None),
+    ("modules", {"topic_id": {"$in": [NO_ID]}}, None),
+    ("content", {"module_id": NO_ID}, None),
+    ("content", {"module_id": NO_ID, "content_type": "quiz"}, None),
+    ("content", {"module_id": NO_ID, "content_type": {"$gt": "glossary"}}, [("content_type", 1)]),
+    ("content", {"module_id": {"$in": [NO_ID]}}, None),
+    ("content", {}, [("module_id", 1), ("content_type", 1)]),
+    ("progress_events", {"module_id": {"$in": [NO_ID]}, "event_type": {"$in": ["exercise_answered", "quiz_scored"]}}, None),
+    ("progress_events", {"module_id": NO_ID, "event_type": "question_answered", "user_id": {"$in": [NO_ID]}}, None),
+    ("topic_progress", {"topic_id": NO_ID}, [("user_id", 1)]),
+    ("topic_progress", {"topic_id": NO_ID, "user_id": {"$gt": NO_ID}}, [("user_id", 1)]),
+    ("topic_progress", {"user_id": NO_ID, "grade_id": NO_ID}, None),
+    ("grade_leaderboard", {"grade_id": NO_ID}, [("points", -1)]),
+    ("jobs", {"active": True}, None),
+]
+
+async def ensure_indexes():
+    # One failing index (say, a unique one over existing duplicates) must not keep the others from being built
+    for collection, indexes in COLLECTION_INDEXES.items():
+        for keys, options in indexes:
+            try:
+                await db[collection].create_index(keys, **options)
+            except Exception as e:
+                logger.error(f"Could not create index {keys} on {collection}: {str(e)}")
+
+def plan_stages(plan):
+    stages = [plan.get("stage")]
+    if "inputStage" in plan:
+        stages.extend(plan_stages(plan["inputStage"]))
+    for child in plan.get("inputStages", []):
+        stages.extend(plan_stages(child))
+    return stages
+
+# In-memory cache of the grade -> topic -> module hierarchy.
+# The curriculum only changes when the seeding endpoints run, so every write
+# path bumps `version` and the next read reloads the whole tree from Mongo.
+class CurriculumCache:
+    def __init__(self):
+        self.version = 0
+        self.loaded_version = -1
+        self.hits = 0
+        self.misses = 0
+        self.grades: Dict[str, dict] = {}
+        self.topics: Dict[str, dict] = {}
+        self.modules: Dict[str, dict] = {}
+        self.active_grades: List[dict] = []
+        self.topics_by_grade: Dict[str, List[dict]] = {}
+        self.modules_by_topic: Dict[str, List[dict]] = {}
+        self.etag = ""
+        self.last_modified: Optional[datetime] = None
+        self._lock = asyncio.Lock()
+
+    def invalidate(self):
+        self.version += 1
+
+    async def ensure_loaded(self):
+        if self.loaded_version == self.version:
+            self.hits += 1
+            return
+        async with self._lock:
+            if self.loaded_version == self.version:
+                self.hits += 1
+                return
+            self.misses += 1
+            await self._load()
+
+    async def _load(self):
+        # From the primary: reloads follow imports and publishes a lagging secondary may not have yet
+        version = self.version
+        raw_grades = await db.grades.find({}).sort("grade_number", 1).to_list(None)
+        raw_topics = await db.topics.find({}).sort("order", 1).to_list(None)
+        raw_modules = await db.modules.find({}).sort("order", 1).to_list(None)
+        grades = [shape_document(str_object_id(g), Grade) for g in raw_grades]
+        topics = [shape_document(str_object_id(t), Topic) for t in raw_topics]
+        modules = [shape_document(str_object_id(m), Module) for m in raw_modules]
+
+        topics_by_grade: Dict[str, List[dict]] = {}
+        for topic in topics:
+            if topic.get("is_active", True):
+                topics_by_grade.setdefault(topic["grade_id"], []).append(topic)
+        modules_by_topic: Dict[str, List[dict]] = {}
+        for module in modules:
+            if module.get("is_active", True):
+                modules_by_topic.setdefault(module["topic_id"], []).append(module)
+
+        self.grades = {g["_id"]: g for g in grades}
+        self.topics = {t["_id"]: t for t in topics}
+        self.modules = {m["_id"]: m for m in modules}
+        self.active_grades = [g for g in grades if g.get("is_active", True)]
+        self.topics_by_grade = topics_by_grade
+        self.modules_by_topic = modules_by_topic
+        self.etag = document_hash([grades, topics, modules])
+        self.last_modified = max(filter(None, map(modified_at, raw_grades + raw_topics + raw_modules)), default=None)
+        self.loaded_version = version
+
+    def not_modified(self, request: Request, response: Response):
+        return conditional_response(request, response, self.etag, self.last_modified)
+
+    def grade_tree(self, grade: dict) -> dict:
+        topics = []
+        for topic in self.topics_by_grade.get(grade["_id"], []):
+            topics.append({**topic, "modules": self.modules_by_topic.get(topic["_id"], [])})
+        return {**grade, "topics": topics}
+
+    def tree(self) -> List[dict]:
+        return [self.grade_tree(grade) for grade in self.active_grades]
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "version": self.version,
+            "loaded_version": self.loaded_version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "grades": len(self.grades),
+            "topics": len(self.topics),
+            "modules": len(self.modules),
+        }
+
+curriculum_cache = CurriculumCache()
+
+# Published snapshots: every module's content is rendered once to JSON bytes
+# and pre-compressed, so content reads skip Mongo, Pydantic and compression.
+# Quality 11 is ~100x slower than 9 for a few percent smaller bodies, and every
+# publish compresses every module, so snapshots default to 9
+SNAPSHOT_BROTLI_QUALITY = int(os.environ.get('SNAPSHOT_BROTLI_QUALITY', '9'))
+
+class Snapshot:
+    def __init__(self, payload, etag: str, last_modified: Optional[datetime] = None,
+                 body: Optional[bytes] = None, brotli_quality: int = SNAPSHOT_BROTLI_QUALITY):
+        # body, when given, is the payload already rendered to JSON
+        self.body = body if body is not None else orjson.dumps(payload, default=json_default, option=orjson.OPT_NON_STR_KEYS)
+        self.etag = etag
+        self.last_modified = last_modified
+        self.encoded = {"gzip": gzip.compress(self.body, compresslevel=9)}
+        if brotli:
+            self.encoded["br"] = brotli.compress(self.body, quality=brotli_quality)
+        # MessagePack renderings, built on first request: format -> {encoding: bytes}
+        self.packed: Dict[str, Dict[str, bytes]] = {}
+
+    def representation(self, negotiated: str) -> Dict[str, bytes]:
+        if negotiated == "json":
+            return {"identity": self.body, **self.encoded}
+        if negotiated not in self.packed:
+            body = encode_msgpack(orjson.loads(self.body), negotiated)
+            self.packed[negotiated] = {"identity": body, "gzip": gzip.compress(body, compresslevel=6)}
+        return self.packed[negotiated]
+
+    def respond(self, request: Request):
+        headers = validator_headers(self.etag, self.last_modified)
+        headers["Vary"] = "Accept, Accept-Encoding" if msgpack else "Accept-Encoding"
+        if client_copy_is_current(request, headers["ETag"], self.last_modified):
+            return Response(status_code=304, headers=headers)
+
+        negotiated = response_format.get()
+        media_type = RESPONSE_MEDIA_TYPES[negotiated]
+        bodies = self.representation(negotiated)
+        accepted = [token.split(";")[0].strip() for token in request.headers.get("accept-encoding", "").split(",")
+                    if not token.replace(" ", "").endswith(";q=0")]
+        for encoding in ("br", "gzip"):
+            if encoding in accepted and encoding in bodies:
+                headers["Content-Encoding"] = encoding
+                return Response(bodies[encoding], media_type=media_type, headers=headers)
+        return Response(bodies["identity"], media_type=media_type, headers=headers)
+
+    def size(self):
+        return (len(self.body) + sum(len(blob) for blob in self.encoded.values())
+                + sum(len(blob) for bodies in self.packed.values() for blob in bodies.values()))
+
+def summarize_content(doc):
+    return {
+        **shape_document(doc, ContentSummary),
+        "glossary_count": len(doc.get("glossary_terms") or []),
+        "exercise_count": len(doc.get("exercises") or []),
+        "question_count": len(doc.get("quiz_questions") or []),
+    }
+
+def build_module_snapshots(docs: List[dict]) -> Dict[str, Snapshot]:
+    snapshots = {}
+    for doc in docs:
+        snapshots[doc["content_type"]] = Snapshot(public_content(doc), content_etag(doc), modified_at(doc))
+    last_modified = max(filter(None, map(modified_at, docs)), default=None)
+    hashes = [content_hash(d) for d in docs]
+    snapshots["list"] = Snapshot([public_content(d) for d in docs], document_hash([content_etag(d) for d in docs]), last_modified)
+    snapshots["summary"] = Snapshot([summarize_content(d) for d in docs], document_hash(["summary"] + hashes), last_modified)
+    return snapshots
+
+# Practice exercises of each module, grouped by difficulty at publish time so
+# adaptive selection only draws indexes from precomputed pools
+def exercise_pool(doc):
+    exercises = shape_document(doc, Content)["exercises"] or []
+    pools: Dict[str, List[int]] = {difficulty: [] for difficulty in DIFFICULTIES}
+    for i, exercise in enumerate(exercises):
+        difficulty = exercise.get("difficulty")
+        pools[difficulty if difficulty in pools else "medium"].append(i)
+    return {"exercises": exercises, "pools": {difficulty: tuple(indexes) for difficulty, indexes in pools.items()}}
+
+# Full-text index over published content, updated module by module on publish
+search_index = SearchIndex()
+
+class ContentSnapshots:
+    def __init__(self):
+        self.modules: Dict[str, Dict[str, Snapshot]] = {}
+        # module_id -> precomputed quiz answer key
+        self.answer_keys: Dict[str, dict] = {}
+        # module_id -> practice exercises and their difficulty pools
+        self.exercise_pools: Dict[str, dict] = {}
+        self.published_at: Optional[datetime] = None
+        self._trees: Dict[Any, Snapshot] = {}
+        self._tree_etag = ""
+
+    def get(self, module_id: str, key: str) -> Optional[Snapshot]:
+        return self.modules.get(module_id, {}).get(key)
+
+    def is_published(self, module_id: str) -> bool:
+        return module_id in self.modules
+
+    async def publish(self):
+        """Rebuild snapshots for every module"""
+        await curriculum_cache.ensure_loaded()
+        docs = await db.content.find({}).to_list(None)
+        self.modules, self.answer_keys, self.exercise_pools = await self._build(list(curriculum_cache.modules), docs)
+        for module_id in set(search_index.module_entries) - set(self.modules):
+            search_index.remove_module(module_id)
+        self.published_at = datetime.utcnow()
+
+    async def publish_modules(self, module_ids: List[str]):
+        """Rebuild snapshots only for the modules touched by a write"""
+        module_ids = list(set(module_ids))
+        if not module_ids:
+            return
+        docs = await db.content.find({"module_id": {"$in": module_ids}}).to_list(None)
+        modules, answer_keys, exercise_pools = await self._build(module_ids, docs)
+        self.modules = {**self.modules, **modules}
+        self.answer_keys = {**{k: v for k, v in self.answer_keys.items() if k not in modules}, **answer_keys}
+        self.exercise_pools = {**{k: v for k, v in self.exercise_pools.items() if k not in modules}, **exercise_pools}
+        self.published_at = datetime.utcnow()
+
+    async def _build(self, module_ids: List[str], docs: List[dict]):
+        by_module: Dict[str, List[dict]] = {module_id: [] for module_id in module_ids}
+        for doc in docs:
+            by_module.setdefault(doc["module_id"], []).append(doc)
+        answer_keys = {doc["module_id"]: answer_key(doc) for doc in docs if doc["content_type"] == "quiz"}
+        exercise_pools = {doc["module_id"]: exercise_pool(doc) for doc in docs if doc["content_type"] == "practice_exercises"}
+        for module_id, module_docs in by_module.items():
+            search_index.replace_module(module_id, module_docs)
+        # Compression is CPU bound, keep it off the event loop
+        modules = await asyncio.to_thread(
+            lambda: {module_id: build_module_snapshots(module_docs) for module_id, module_docs in by_module.items()}
+        )
+        return modules, answer_keys, exercise_pools
+
+    def tree(self, key=None) -> Optional[Snapshot]:
+        """Snapshot of the whole curriculum tree (key=None) or one grade's tree"""
+        if self._tree_etag != curriculum_cache.etag:
+            self._trees = {}
+            self._tree_etag = curriculum_cache.etag
+        if key not in self._trees:
+            if key is None:
+                payload = curriculum_cache.tree()
+            else:
+                grade = next((g for g in curriculum_cache.active_grades if g["grade_number"] == key), None)
+                if not grade:
+                    return None
+                payload = curriculum_cache.grade_tree(grade)
+            self._trees[key] = Snapshot(payload, curriculum_cache.etag, curriculum_cache.last_modified)
+        return self._trees[key]
+
+    def stats(self):
+        return {
+            "modules": len(self.modules),
+            "snapshots": sum(len(s) for s in self.modules.values()),
+            "bytes": sum(snap.size() for s in self.modules.values() for snap in s.values()),
+            "brotli": brotli is not None,
+            "published_at": self.published_at,
+        }
+
+content_snapshots = ContentSnapshots()
+
+# Offline bundles: a whole grade in one compressed download. The manifest maps
+# each module to the hash of its content, and the version hashes the manifest
+# and the grade's tree, so every worker derives the same version. Manifests are
+# stored in the bundle_manifests collection, so a client passing
+# ?since=<version> only receives the modules whose hash changed, whichever
+# worker it reaches and across restarts; unknown versions get the full bundle.
+BUNDLE_FORMAT = "grade-bundle-1"
+BUNDLE_HISTORY = int(os.environ.get('BUNDLE_HISTORY', '20'))
+BUNDLE_CACHE_SIZE = int(os.environ.get('BUNDLE_CACHE_SIZE', '64'))
+BUNDLE_BROTLI_QUALITY = int(os.environ.get('BUNDLE_BROTLI_QUALITY', '9'))
+BUNDLE_VERSION_LENGTH = 20
+
+def is_bundle_version(value: str) -> bool:
+    return len(value) == BUNDLE_VERSION_LENGTH and all(c in "0123456789abcdef" for c in value)
+
+class GradeBundles:
+    def __init__(self, history: int, max_bundles: int):
+        self.history = history
+        self.max_bundles = max_bundles
+        # grade_id -> version -> manifest, least recently used first
+        self.manifests: Dict[str, Dict[str, Dict[str, str]]] = {}
+        # (grade_id, version, since) -> bundle, least recently used first
+        self._bundles: Dict[Any, Snapshot] = {}
+        self._current_by_grade: Dict[str, Any] = {}
+        self._token: Any = None
+        self.builds = 0
+        self.manifest_lookups = 0
+
+    def _remember(self, grade_id: str, version: str, manifest: Dict[str, str]):
+        versions = self.manifests.setdefault(grade_id, {})
+        versions.pop(version, None)
+        versions[version] = manifest
+        while len(versions) > self.history:
+            del versions[next(iter(versions))]
+
+    async def _current(self, grade: dict):
+        tree = curriculum_cache.grade_tree(grade)
+        module_ids = [module["_id"] for topic in tree["topics"] for module in topic["modules"]]
+        manifest = {}
+        for module_id in module_ids:
+            snapshot = content_snapshots.get(module_id, "list")
+            if snapshot:
+                manifest[module_id] = snapshot.etag
+        version = document_hash([BUNDLE_FORMAT, tree, manifest])[:BUNDLE_VERSION_LENGTH]
+        if version not in self.manifests.get(grade["_id"], {}):
+            try:
+                await db.bundle_manifests.update_one(
+                    {"_id": f"{grade['_id']}:{version}"},
+                    {"$setOnInsert": {"grade_id": grade["_id"], "version": version, "manifest": manifest,
+                                      "created_at": datetime.utcnow()}},
+                    upsert=True,
+                )
+            except Exception as e:
+                logger.warning(f"Could not store bundle manifest, deltas from it stay local: {str(e)}")
+        self._remember(grade["_id"], version, manifest)
+        return tree, manifest, version
+
+    async def _previous(self, grade_id: str, since: Optional[str]) -> Optional[str]:
+        """`since` when its manifest is known here or in Mongo, else None"""
+        if not since or not is_bundle_version(since):
+            return None
+        versions = self.manifests.get(grade_id, {})
+        if since in versions:
+            return since
+        self.manifest_lookups += 1
+        doc = await db.bundle_manifests.find_one({"_id": f"{grade_id}:{since}"})
+        if not doc:
+            return None
+        self._remember(grade_id, since, doc["manifest"])
+        return since
+
+    def _build(self, tree: dict, manifest: Dict[str, str], version: str, since: Optional[str],
+               previous: Optional[Dict[str, str]]) -> Snapshot:
+        if previous is None:
+            changed = list(manifest)
+            removed = []
+        else:
+            changed = [module_id for module_id, digest in manifest.items() if previous.get(module_id) != digest]
+            removed = [module_id for module_id in previous if module_id not in manifest]
+        head = orjson.dumps({
+            "format": BUNDLE_FORMAT,
+            "version": version,
+            "since": since,
+            "full": previous is None,
+            "grade": tree,
+            "manifest": manifest,
+            "removed": removed,
+        }, default=json_default)
+        # Splice in the module content already rendered by the snapshots
+        content = b",".join(
+            orjson.dumps(module_id) + b":" + content_snapshots.get(module_id, "list").body for module_id in changed
+        )
+        body = head[:-1] + b',"content":{' + content + b"}}"
+        etag = document_hash([version, since])
+        return Snapshot(None, etag, curriculum_cache.last_modified, body=body, brotli_quality=BUNDLE_BROTLI_QUALITY)
+
+    async def get(self, grade: dict, since: Optional[str] = None) -> Snapshot:
+        token = (curriculum_cache.etag, content_snapshots.published_at)
+        if token != self._token:
+            self._bundles = {}
+            self._current_by_grade = {}
+            self._token = token
+        if grade["_id"] not in self._current_by_grade:
+            self._current_by_grade[grade["_id"]] = await self._current(grade)
+        tree, manifest, version = self._current_by_grade[grade["_id"]]
+        # Only known versions reach the cache key, so arbitrary ?since= values all share the full bundle
+        since = await self._previous(grade["_id"], since)
+        key = (grade["_id"], version, since)
+        bundle = self._bundles.pop(key, None)
+        if bundle is None:
+            previous = self.manifests[grade["_id"]].get(since) if since else None
+            # Compression of a whole grade is CPU bound, keep it off the event loop
+            bundle = await asyncio.to_thread(self._build, tree, manifest, version, since if previous else None, previous)
+            self.builds += 1
+        self._bundles[key] = bundle
+        while len(self._bundles) > self.max_bundles:
+            del self._bundles[next(iter(self._bundles))]
+        return bundle
+
+    def stats(self):
+        return {
+            "cached": len(self._bundles),
+            "builds": self.builds,
+            "manifest_lookups": self.manifest_lookups,
+            "bytes": sum(bundle.size() for bundle in self._bundles.values()),
+            "versions": {grade_id: len(versions) for grade_id, versions in self.manifests.items()},
+        }
+
+grade_bundles = GradeBundles(BUNDLE_HISTORY, BUNDLE_CACHE_SIZE)
+
+async def aiter_records(records):
+    for record in records:
+        yield record
+
+async def refresh_after_import(importer):
+    # Loaded like any other revision: only the touched modules are re-rendered,
+    # unless this worker has not loaded an earlier revision another worker wrote.
+    # The other workers pick the import up from its revision
+    await curriculum_watcher.apply({"revision": importer.revision, "modules": sorted(importer.touched_modules)})
+
+async def republish_after_failure(source: str):
+    """Serve what Mongo holds after a failed import. Without a transaction the
+    import may have written part of its records, so every worker reloads"""
+    try:
+        await curriculum_watcher.apply({"revision": await bump_revision(db), "modules": None})
+    except Exception:
+        logger.exception("Republishing after the failed %s failed, serving the previous snapshots", source)
+
+# Each worker process holds its own cache and snapshots. Every curriculum write
+# bumps a revision document; workers follow it through a change stream on
+# replica sets, or by polling it on standalone servers
+CURRICULUM_CHANGE_STREAM = os.environ.get('CURRICULUM_CHANGE_STREAM', 'true').lower() == 'true'
+CURRICULUM_POLL_INTERVAL = float(os.environ.get('CURRICULUM_POLL_INTERVAL', '2.0'))
+
+class CurriculumWatcher:
+    def __init__(self, poll_interval: float):
+        self.poll_interval = poll_interval
+        self.revision = 0  # last revision this worker has loaded
+        self.mode: Optional[str] = None
+        self.reloads = 0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def current(self) -> Optional[dict]:
+        return await db.meta.find_one({"_id": REVISION_ID})
+
+    async def apply(self, doc: Optional[dict]):
+        """Load a revision document, whether another worker or this one wrote it"""
+        async with self._lock:
+            if not doc or doc["revision"] <= self.revision:
+                return
+            curriculum_cache.invalidate()
+            await curriculum_cache.ensure_loaded()
+            if doc.get("modules") is None or doc["revision"] > self.revision + 1:
+                # A full publish, or revisions were missed along with their module lists
+                await content_snapshots.publish()
+            else:
+                await content_snapshots.publish_modules(doc["modules"])
+            self.revision = doc["revision"]
+            self.reloads += 1
+            logger.info("Curriculum reloaded at revision %s", self.revision)
+
+    async def _watch(self):
+        pipeline = [{"$match": {"documentKey._id": REVISION_ID}}]
+        async with db.meta.watch(pipeline, full_document="updateLookup") as stream:
+            self.mode = "change_stream"
+            # Catch up on anything written between startup and the stream opening
+            await self.apply(await self.current())
+            async for change in stream:
+                await self.apply(change.get("fullDocument"))
+
+    async def _run(self):
+        if CURRICULUM_CHANGE_STREAM:
+            try:
+                await self._watch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.info(f"Curriculum change stream unavailable, polling every {self.poll_interval}s: {str(e)}")
+        self.mode = "poll"
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.apply(await self.current())
+            except Exception as e:
+                logger.warning(f"Curriculum revision check failed: {str(e)}")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self):
+        return {"revision": self.revision, "mode": self.mode, "reloads": self.reloads, "pid": os.getpid()}
+
+curriculum_watcher = CurriculumWatcher(CURRICULUM_POLL_INTERVAL)
+
+# With USER_READ_PREFERENCE set to a secondary mode, each user's reads run in a
+# causally consistent session advanced past that user's latest write, so a
+# secondary waits until it has caught up instead of returning older data. The
+# write times are only known to the worker that made the write, so this gives
+# read-your-writes with a single worker only; multi-worker deployments keep
+# the default, primary
+USER_SESSIONS_MAX_USERS = 100000
+
+class UserSessions:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        # Causal consistency needs a replica set or sharded cluster, detected at startup
+        self.enabled = False
+        # user_id -> (cluster_time, operation_time) of their latest write, least recently written first
+        self.times: Dict[str, tuple] = {}
+        self.sessions = 0
+
+    @property
+    def db(self):
+        # Without a causal session a secondary could return data older than the user's own writes
+        return user_db if self.enabled else db
+
+    @asynccontextmanager
+    async def start(self, user_id: Optional[str] = None):
+        if not self.enabled:
+            yield None
+            return
+        async with await client.start_session(causal_consistency=True) as session:
+            self.sessions += 1
+            cluster_time, operation_time = self.times.get(user_id, (None, None))
+            if cluster_time is not None:
+                session.advance_cluster_time(cluster_time)
+            if operation_time is not None:
+                session.advance_operation_time(operation_time)
+            yield session
+
+    def record(self, user_ids, session):
+        if session is None or session.operation_time is None:
+            return
+        for user_id in user_ids:
+            self.times.pop(user_id, None)
+            self.times[user_id] = (session.cluster_time, session.operation_time)
+        while len(self.times) > self.max_entries:
+            del self.times[next(iter(self.times))]
+
+    def stats(self):
+        return {"enabled": self.enabled, "tracked_users": len(self.times), "sessions": self.sessions}
+
+user_sessions = UserSessions(USER_SESSIONS_MAX_USERS)
+
+# Progress is only accepted for existing users. Ids found are remembered, so a
+# class answering a quiz costs one lookup per student rather than one per click
+KNOWN_USERS_MAX = 100000
+
+class KnownUsers:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        # user_id -> None, least recently added first
+        self.ids: Dict[str, None] = {}
+        self.lookups = 0
+
+    def add(self, user_id: str):
+        self.ids[user_id] = None
+        if len(self.ids) > self.max_entries:
+            del self.ids[next(iter(self.ids))]
+
+    async def exists(self, user_id: str) -> bool:
+        if user_id in self.ids:
+            return True
+        # Misses are not remembered: the user may be created on another worker any moment
+        self.lookups += 1
+        if await db.users.find_one({"_id": ObjectId(user_id)}, {"_id": 1}) is None:
+            return False
+        self.add(user_id)
+        return True
+
+    def stats(self):
+        return {"known": len(self.ids), "lookups": self.lookups}
+
+known_users = KnownUsers(KNOWN_USERS_MAX)
+
+# Progress events are coalesced per user in memory and written with one
+# bulk_write per flush, so a class answering a quiz together costs a few
+# writes per second instead of one per click
+PROGRESS_FLUSH_INTERVAL = float(os.environ.get('PROGRESS_FLUSH_INTERVAL', '1.0'))
+PROGRESS_FLUSH_SIZE = int(os.environ.get('PROGRESS_FLUSH_SIZE', '500'))
+
+def progress_update(event: ProgressEvent):
+    prefix = f"progress.modules.{event.module_id}"
+    update: Dict[str, Dict[str, Any]] = {"$inc": {}, "$set": {f"{prefix}.last_activity_at": event.created_at}, "$max": {}}
+    if event.event_type == "module_viewed":
+        update["$inc"][f"{prefix}.views"] = 1
+    elif event.event_type == "exercise_answered":
+        update["$inc"][f"{prefix}.exercises_answered"] = 1
+        update["$inc"][f"{prefix}.exercises_correct"] = 1 if event.is_correct else 0
+    elif event.event_type == "quiz_scored":
+        update["$inc"][f"{prefix}.quiz_attempts"] = 1
+        update["$set"][f"{prefix}.last_quiz_score"] = event.score
+        update["$max"][f"{prefix}.best_quiz_score"] = event.score
+    return update
+
+def merge_update(target: Dict[str, Dict[str, Any]], update: Dict[str, Dict[str, Any]]):
+    """Fold `update` into `target`; `update` is the newer of the two"""
+    for path, value in update["$inc"].items():
+        target["$inc"][path] = target["$inc"].get(path, 0) + value
+    target["$set"].update(update["$set"])
+    for path, value in update["$max"].items():
+        target["$max"][path] = max(target["$max"].get(path, value), value)
+
+class ProgressBuffer:
+    def __init__(self, flush_interval: float, flush_size: int):
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.updates: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.events: List[dict] = []
+        self.received = 0
+        self.flushes = 0
+        self.user_writes = 0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._size_flush: Optional[asyncio.Task] = None
+
+    def add(self, user_id: str, event: ProgressEvent):
+        pending = self.updates.setdefault(user_id, {"$inc": {}, "$set": {}, "$max": {}})
+        merge_update(pending, progress_update(event))
+        # The id makes a retried insert of an already stored event a duplicate key rather than a second copy
+        self.events.append({"_id": ObjectId(), "user_id": user_id, **event.model_dump()})
+        self.received += 1
+        if len(self.events) >= self.flush_size and (self._size_flush is None or self._size_flush.done()):
+            self._size_flush = asyncio.create_task(self.flush())
+            self._size_flush.add_done_callback(self._size_flush_done)
+
+    def _size_flush_done(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Progress flush failed, will retry: {str(task.exception())}")
+
+    def has_pending(self, user_id: str) -> bool:
+        return user_id in self.updates
+
+    async def _write_users(self, updates: Dict[str, Dict[str, Dict[str, Any]]], session) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Apply the per-user updates; returns the ones that failed and must be retried"""
+        user_ids = list(updates)
+        ops = [
+            UpdateOne({"_id": ObjectId(user_id)}, {op: fields for op, fields in updates[user_id].items() if fields})
+            for user_id in user_ids
+        ]
+        if not ops:
+            return {}
+        failed: set = set()
+        try:
+            await user_sessions.db.users.bulk_write(ops, ordered=False, session=session)
+        except BulkWriteError as e:
+            failed = {user_ids[error["index"]] for error in e.details["writeErrors"]}
+            logger.warning(f"Progress update failed for {len(failed)} users, will retry: {str(e)}")
+        self.user_writes += len(ops) - len(failed)
+        return {user_id: updates[user_id] for user_id in failed}
+
+    async def _write_events(self, events: List[dict], session) -> List[dict]:
+        """Insert the events; returns the ones that failed and must be retried"""
+        if not events:
+            return []
+        try:
+            await user_sessions.db.progress_events.insert_many(events, ordered=False, session=session)
+        except BulkWriteError as e:
+            # Duplicate keys are events a previous, seemingly failed attempt already stored
+            failed = [error["index"] for error in e.details["writeErrors"] if error["code"] != 11000]
+            if failed:
+                logger.warning(f"Could not store {len(failed)} progress events, will retry: {str(e)}")
+            return [events[i] for i in failed]
+        return []
+
+    def _requeue(self, updates: Dict[str, Dict[str, Dict[str, Any]]], events: List[dict]):
+        # Put what is left of the batch back in front of anything that arrived meanwhile
+        for user_id, update in self.updates.items():
+            merge_update(updates.setdefault(user_id, {"$inc": {}, "$set": {}, "$max": {}}), update)
+        self.updates, self.events = updates, events + self.events
+
+    async def flush(self):
+        """Write the pending batch. Each stage retries only what it failed to write, so a
+        retry never applies a user's $inc twice or stores an event twice"""
+        async with self._lock:
+            updates, events = self.updates, self.events
+            self.updates, self.events = {}, []
+            if not updates and not events:
+                return
+            retry_updates, retry_events = updates, events
+            try:
+                async with user_sessions.start() as session:
+                    retry_updates = await self._write_users(updates, session)
+                    retry_events = await self._write_events(events, session)
+                    failed_ids = {event["_id"] for event in retry_events}
+                    stored = [event for event in events if event["_id"] not in failed_ids]
+                    # The events are stored, so a failure here is repaired by a rebuild rather than a retry
+                    try:
+                        await write_summaries(user_sessions.db, stored, curriculum_cache.modules, curriculum_cache.topics,
+                                              session=session)
+                    except Exception as e:
+                        logger.warning(f"Could not update progress summaries, rebuild them: {str(e)}")
+                    user_sessions.record([user_id for user_id in updates if user_id not in retry_updates], session)
+            finally:
+                if retry_updates or retry_events:
+                    self._requeue(retry_updates, retry_events)
+            self.flushes += 1
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning(f"Progress flush failed, will retry: {str(e)}")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._size_flush is not None:
+            await asyncio.gather(self._size_flush, return_exceptions=True)
+        await self.flush()
+
+    def stats(self):
+        return {
+            "received": self.received,
+            "pending_events": len(self.events),
+            "pending_users": len(self.updates),
+            "flushes": self.flushes,
+            "user_writes": self.user_writes,
+        }
+
+progress_buffer = ProgressBuffer(PROGRESS_FLUSH_INTERVAL, PROGRESS_FLUSH_SIZE)
+
 # API Endpoints
 
 @api_router.get("/")
@@ -118,69 +1395,235 @@ async def root():
 
 # Grade endpoints
 @api_router.get("/grades", response_model=List[Grade])
-async def get_grades():
-    grades = await db.grades.find({"is_active": True}).sort("grade_number", 1).to_list(100)
-    return [Grade(**str_object_id(grade)) for grade in grades]
+async def get_grades(request: Request, response: Response):
+    await curriculum_cache.ensure_loaded()
+    if not_modified := curriculum_cache.not_modified(request, response):
+        return not_modified
+    return fast_response(curriculum_cache.active_grades, response)
 
 @api_router.get("/grades/{grade_id}", response_model=Grade)
-async def get_grade(grade_id: str):
+async def get_grade(grade_id: str, request: Request, response: Response):
     if not ObjectId.is_valid(grade_id):
         raise HTTPException(status_code=400, detail="Invalid grade ID")
     
-    grade = await db.grades.find_one({"_id": ObjectId(grade_id)})
+    await curriculum_cache.ensure_loaded()
+    grade = curriculum_cache.grades.get(grade_id)
     if not grade:
         raise HTTPException(status_code=404, detail="Grade not found")
-    return Grade(**str_object_id(grade))
+    if not_modified := curriculum_cache.not_modified(request, response):
+        return not_modified
+    return fast_response(grade, response)
+
+# Curriculum tree endpoints
+@api_router.get("/tree", response_model=List[GradeTree])
+async def get_tree(request: Request):
+    await curriculum_cache.ensure_loaded()
+    return content_snapshots.tree().respond(request)
+
+@api_router.get("/grades/by-number/{grade_number}/tree", response_model=GradeTree)
+async def get_grade_tree_by_number(grade_number: int, request: Request):
+    await curriculum_cache.ensure_loaded()
+    snapshot = content_snapshots.tree(grade_number)
+    if not snapshot:
+        raise HTTPException(status_code=404, detail="Grade not found")
+    return snapshot.respond(request)
+
+@api_router.get("/grades/{grade_id}/bundle")
+async def get_grade_bundle(grade_id: str, request: Request, since: Optional[str] = None):
+    if not ObjectId.is_valid(grade_id):
+        raise HTTPException(status_code=400, detail="Invalid grade ID")
+
+    await curriculum_cache.ensure_loaded()
+    grade = curriculum_cache.grades.get(grade_id)
+    if not grade or not grade.get("is_active", True):
+        raise HTTPException(status_code=404, detail="Grade not found")
+    bundle = await grade_bundles.get(grade, since)
+    return bundle.respond(request)
+
+# Keyset pagination and NDJSON streaming for list endpoints
+MAX_PAGE_SIZE = 500
+
+def check_list_params(limit: Optional[int], format: Optional[str]):
+    if limit is not None and not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    if format not in (None, "json", "ndjson"):
+        raise HTTPException(status_code=400, detail="Invalid format")
+
+def keyset_page(items: List[dict], key: str, after, limit: Optional[int], response: Response):
+    """Items whose `key` is greater than `after`; X-Next-After points at the next page"""
+    if after is not None:
+        items = [item for item in items if item[key] > after]
+    if limit is not None:
+        if len(items) > limit:
+            response.headers["X-Next-After"] = str(items[limit - 1][key])
+        items = items[:limit]
+    return items
+
+async def ndjson_lines(docs, shape=lambda doc: doc):
+    async for doc in docs:
+        yield orjson.dumps(shape(doc), default=json_default) + b"\n"
+
+def ndjson_response(docs, shape=lambda doc: doc):
+    return StreamingResponse(ndjson_lines(docs, shape), media_type="application/x-ndjson")
 
 # Topic endpoints
 @api_router.get("/grades/{grade_id}/topics", response_model=List[Topic])
-async def get_topics_by_grade(grade_id: str):
+async def get_topics_by_grade(grade_id: str, request: Request, response: Response,
+                              after: Optional[int] = None, limit: Optional[int] = None, format: Optional[str] = None):
     if not ObjectId.is_valid(grade_id):
         raise HTTPException(status_code=400, detail="Invalid grade ID")
+    check_list_params(limit, format)
     
-    topics = await db.topics.find({"grade_id": grade_id, "is_active": True}).sort("order", 1).to_list(100)
-    return [Topic(**str_object_id(topic)) for topic in topics]
+    await curriculum_cache.ensure_loaded()
+    if not_modified := curriculum_cache.not_modified(request, response):
+        return not_modified
+    topics = keyset_page(curriculum_cache.topics_by_grade.get(grade_id, []), "order", after, limit, response)
+    if format == "ndjson":
+        return ndjson_response(aiter_records(topics))
+    return fast_response(topics, response)
 
 @api_router.get("/topics/{topic_id}", response_model=Topic)
-async def get_topic(topic_id: str):
+async def get_topic(topic_id: str, request: Request, response: Response):
     if not ObjectId.is_valid(topic_id):
         raise HTTPException(status_code=400, detail="Invalid topic ID")
     
-    topic = await db.topics.find_one({"_id": ObjectId(topic_id)})
+    await curriculum_cache.ensure_loaded()
+    topic = curriculum_cache.topics.get(topic_id)
     if not topic:
         raise HTTPException(status_code=404, detail="Topic not found")
-    return Topic(**str_object_id(topic))
+    if not_modified := curriculum_cache.not_modified(request, response):
+        return not_modified
+    return fast_response(topic, response)
 
 # Module endpoints
 @api_router.get("/topics/{topic_id}/modules", response_model=List[Module])
-async def get_modules_by_topic(topic_id: str):
+async def get_modules_by_topic(topic_id: str, request: Request, response: Response,
+                               after: Optional[int] = None, limit: Optional[int] = None, format: Optional[str] = None):
     if not ObjectId.is_valid(topic_id):
         raise HTTPException(status_code=400, detail="Invalid topic ID")
+    check_list_params(limit, format)
     
-    modules = await db.modules.find({"topic_id": topic_id, "is_active": True}).sort("order", 1).to_list(100)
-    return [Module(**str_object_id(module)) for module in modules]
+    await curriculum_cache.ensure_loaded()
+    if not_modified := curriculum_cache.not_modified(request, response):
+        return not_modified
+    modules = keyset_page(curriculum_cache.modules_by_topic.get(topic_id, []), "order", after, limit, response)
+    if format == "ndjson":
+        return ndjson_response(aiter_records(modules))
+    return fast_response(modules, response)
 
 @api_router.get("/modules/{module_id}", response_model=Module)
-async def get_module(module_id: str):
+async def get_module(module_id: str, request: Request, response: Response):
     if not ObjectId.is_valid(module_id):
         raise HTTPException(status_code=400, detail="Invalid module ID")
     
-    module = await db.modules.find_one({"_id": ObjectId(module_id)})
+    await curriculum_cache.ensure_loaded()
+    module = curriculum_cache.modules.get(module_id)
     if not module:
         raise HTTPException(status_code=404, detail="Module not found")
-    return Module(**str_object_id(module))
+    if not_modified := curriculum_cache.not_modified(request, response):
+        return not_modified
+    return fast_response(module, response)
+
+# Concurrent identical reads share one in-flight Mongo query, so a class opening
+# the same quiz at once costs one round trip. Hierarchy reads are already
+# coalesced by the curriculum cache lock
+class SingleFlight:
+    def __init__(self):
+        self._calls: Dict[Any, asyncio.Future] = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key, fn):
+        call = self._calls.get(key)
+        if call is None:
+            call = asyncio.ensure_future(fn())
+            self._calls[key] = call
+            call.add_done_callback(lambda _: self._calls.pop(key, None))
+            self.calls += 1
+        else:
+            self.shared += 1
+        # A cancelled caller must not cancel the query the others are waiting on
+        return await asyncio.shield(call)
+
+    def stats(self):
+        return {"calls": self.calls, "shared": self.shared, "in_flight": len(self._calls)}
+
+content_reads = SingleFlight()
 
 # Content endpoints
-@api_router.get("/modules/{module_id}/content", response_model=List[Content])
-async def get_content_by_module(module_id: str):
+def content_summary_pipeline(module_id: str, after: Optional[str] = None, limit: Optional[int] = None):
+    # Project only titles, types and item counts instead of the full lesson bodies
+    match: Dict[str, Any] = {"module_id": module_id}
+    if after is not None:
+        match["content_type"] = {"$gt": after}
+    pipeline: List[Dict[str, Any]] = [{"$match": match}]
+    if after is not None or limit is not None:
+        pipeline.append({"$sort": {"content_type": 1}})
+    if limit is not None:
+        pipeline.append({"$limit": limit})
+    pipeline.append({"$project": {
+        "module_id": 1,
+        "content_type": 1,
+        "title": 1,
+        "content_hash": 1,
+        "created_at": 1,
+        "updated_at": 1,
+        "glossary_count": {"$size": {"$ifNull": ["$glossary_terms", []]}},
+        "exercise_count": {"$size": {"$ifNull": ["$exercises", []]}},
+        "question_count": {"$size": {"$ifNull": ["$quiz_questions", []]}},
+    }})
+    return pipeline
+
+def content_cursor(module_id: str, summary: bool, after: Optional[str] = None, limit: Optional[int] = None):
+    """Motor cursor over a module's content; paginated reads are ordered by content_type"""
+    if summary:
+        return secondary_db.content.aggregate(content_summary_pipeline(module_id, after, limit))
+    query: Dict[str, Any] = {"module_id": module_id}
+    if after is not None:
+        query["content_type"] = {"$gt": after}
+    cursor = secondary_db.content.find(query)
+    if after is not None or limit is not None:
+        cursor = cursor.sort("content_type", 1)
+    if limit is not None:
+        cursor = cursor.limit(limit)
+    return cursor
+
+@api_router.get("/modules/{module_id}/content", response_model=Union[List[ContentSummary], List[Content]])
+async def get_content_by_module(module_id: str, request: Request, response: Response, fields: Optional[str] = None,
+                                after: Optional[str] = None, limit: Optional[int] = None, format: Optional[str] = None):
     if not ObjectId.is_valid(module_id):
         raise HTTPException(status_code=400, detail="Invalid module ID")
-    
-    content = await db.content.find({"module_id": module_id}).to_list(100)
-    return [Content(**str_object_id(c)) for c in content]
+    if fields not in (None, "full", "summary"):
+        raise HTTPException(status_code=400, detail="Invalid fields value")
+    check_list_params(limit, format)
+    summary = fields == "summary"
+    shape = (lambda c: shape_document(c, ContentSummary)) if summary else public_content
+
+    if format == "ndjson":
+        return ndjson_response(content_cursor(module_id, summary, after, limit), shape)
+
+    paginated = after is not None or limit is not None
+    if not paginated and (snapshot := content_snapshots.get(module_id, "summary" if summary else "list")):
+        return snapshot.respond(request)
+
+    # Fetch one extra document to know whether there is a next page
+    page_limit = limit + 1 if limit else None
+    content = await content_reads.do(
+        ("list", module_id, summary, after, page_limit),
+        lambda: content_cursor(module_id, summary, after, page_limit).to_list(None),
+    )
+    content = keyset_page(content, "content_type", None, limit, response)
+    if summary:
+        etag = document_hash(["summary"] + [c.get("content_hash") or document_hash(c) for c in content])
+    else:
+        etag = document_hash([content_etag(c) for c in content])
+    last_modified = max(filter(None, map(modified_at, content)), default=None)
+    if not_modified := conditional_response(request, response, etag, last_modified):
+        return not_modified
+    return fast_response([shape(c) for c in content], response)
 
-@api_router.get("/modules/{module_id}/content/{content_type}")
-async def get_content_by_type(module_id: str, content_type: str):
+@api_router.get("/modules/{module_id}/content/{content_type}", response_model=Content)
+async def get_content_by_type(module_id: str, content_type: str, request: Request, response: Response):
     if not ObjectId.is_valid(module_id):
         raise HTTPException(status_code=400, detail="Invalid module ID")
     
@@ -188,17 +1631,227 @@ async def get_content_by_type(module_id: str, content_type: str):
     if content_type not in valid_types:
         raise HTTPException(status_code=400, detail="Invalid content type")
     
-    content = await db.content.find_one({"module_id": module_id, "content_type": content_type})
+    if content_snapshots.is_published(module_id):
+        snapshot = content_snapshots.get(module_id, content_type)
+        if not snapshot:
+            raise HTTPException(status_code=404, detail="Content not found")
+        return snapshot.respond(request)
+
+    content = await content_reads.do(
+        ("one", module_id, content_type),
+        lambda: secondary_db.content.find_one({"module_id": module_id, "content_type": content_type}),
+    )
     if not content:
         raise HTTPException(status_code=404, detail="Content not found")
-    return Content(**str_object_id(content))
+    if not_modified := conditional_response(request, response, content_etag(content), modified_at(content)):
+        return not_modified
+    return fast_response(public_content(content), response)
+
+# Quiz grading against the precomputed answer keys
+@api_router.post("/modules/{module_id}/quiz/grade", response_model=QuizGrade)
+async def grade_quiz(module_id: str, submission: QuizSubmission):
+    if not ObjectId.is_valid(module_id):
+        raise HTTPException(status_code=400, detail="Invalid module ID")
+    if submission.user_id is not None and not ObjectId.is_valid(submission.user_id):
+        raise HTTPException(status_code=400, detail="Invalid user ID")
+    if submission.user_id is not None:
+        # Recording the answers is a progress write, limited like POST /users/{user_id}/progress
+        enforce_rate_limit(write_limiter, f"user:{submission.user_id}", "write")
+        if not await known_users.exists(submission.user_id):
+            raise HTTPException(status_code=404, detail="User not found")
+
+    key = content_snapshots.answer_keys.get(module_id)
+    if key is None and not content_snapshots.is_published(module_id):
+        quiz = await secondary_db.content.find_one({"module_id": module_id, "content_type": "quiz"})
+        key = answer_key(quiz) if quiz else None
+    if key is None:
+        raise HTTPException(status_code=404, detail="Quiz not found")
+    if len(submission.answers) != len(key["correct"]):
+        raise HTTPException(status_code=400, detail=f"Expected {len(key['correct'])} answers")
+    for i, (selected, options) in enumerate(zip(submission.answers, key["options"])):
+        if selected is not None and not 0 <= selected < options:
+            raise HTTPException(status_code=400, detail=f"Answer {i} must be between 0 and {options - 1}")
+
+    results = [
+        {"selected_option": selected, "correct_option": correct,
+         "is_correct": selected is not None and selected == correct, "explanation": explanation}
+        for selected, correct, explanation in zip(submission.answers, key["correct"], key["explanations"])
+    ]
+    correct = sum(r["is_correct"] for r in results)
+    total = len(results)
+    score = correct / total if total else 0.0
+
+    if submission.user_id:
+        # Per-question answers feed the class analytics
+        for i, result in enumerate(results):
+            if result["selected_option"] is not None:
+                progress_buffer.add(submission.user_id, ProgressEvent(
+                    event_type="question_answered", module_id=module_id, content_type="quiz", item_index=i,
+                    selected_option=result["selected_option"], is_correct=result["is_correct"],
+                ))
+        progress_buffer.add(submission.user_id, ProgressEvent(event_type="quiz_scored", module_id=module_id, score=score))
+
+    return MongoJSONResponse({"module_id": module_id, "correct": correct, "total": total, "score": score, "results": results})
+
+# Class analytics: progress events are read column by column with a projection
+# and analysed with pandas off the event loop
+ANALYTICS_BATCH_SIZE = 10000
+MASTERY_THRESHOLD = float(os.environ.get('MASTERY_THRESHOLD', '0.8'))
+
+async def events_frame(match: Dict[str, Any], fields: List[str]) -> pd.DataFrame:
+    columns: Dict[str, list] = {field: [] for field in fields}
+    cursor = secondary_db.progress_events.find(match, {"_id": 0, **{field: 1 for field in fields}}, batch_size=ANALYTICS_BATCH_SIZE)
+    while batch := await cursor.to_list(ANALYTICS_BATCH_SIZE):
+        for field, values in columns.items():
+            values.extend(doc.get(field) for doc in batch)
+    return pd.DataFrame(columns)
+
+def class_filter(user_ids: Optional[List[str]]) -> Dict[str, Any]:
+    if not user_ids:
+        return {}
+    if not all(ObjectId.is_valid(user_id) for user_id in user_ids):
+        raise HTTPException(status_code=400, detail="Invalid user ID")
+    return {"user_id": {"$in": user_ids}}
+
+@api_router.get("/analytics/grades/{grade_id}/mastery")
+async def grade_mastery(grade_id: str, user_id: Optional[List[str]] = Query(None)):
+    """Per-module mastery across a class (the given user_ids, or every student)"""
+    if not ObjectId.is_valid(grade_id):
+        raise HTTPException(status_code=400, detail="Invalid grade ID")
+    await curriculum_cache.ensure_loaded()
+    if grade_id not in curriculum_cache.grades:
+        raise HTTPException(status_code=404, detail="Grade not found")
+
+    modules = [module for topic in curriculum_cache.topics_by_grade.get(grade_id, [])
+               for module in curriculum_cache.modules_by_topic.get(topic["_id"], [])]
+    module_ids = [module["_id"] for module in modules]
+    events = await events_frame(
+        {"module_id": {"$in": module_ids}, "event_type": {"$in": ["exercise_answered", "quiz_scored"]}, **class_filter(user_id)},
+        ["user_id", "module_id", "event_type", "is_correct", "score"],
+    )
+    rows = await asyncio.to_thread(analytics.module_mastery, events, module_ids, MASTERY_THRESHOLD)
+    for row, module in zip(rows, modules):
+        row.update({"name": module["name"], "topic_id": module["topic_id"]})
+    return MongoJSONResponse({"grade_id": grade_id, "threshold": MASTERY_THRESHOLD, "events": len(events), "modules": rows})
+
+@api_router.get("/analytics/modules/{module_id}/quiz")
+async def quiz_item_analysis(module_id: str, user_id: Optional[List[str]] = Query(None), top_wrong: int = 3):
+    """Difficulty and discrimination index and the most chosen wrong options of every quiz question"""
+    if not ObjectId.is_valid(module_id):
+        raise HTTPException(status_code=400, detail="Invalid module ID")
+    quiz = await secondary_db.content.find_one(
+        {"module_id": module_id, "content_type": "quiz"},
+        {"quiz_questions.question": 1, "quiz_questions.options.option_text": 1},
+    )
+    if not quiz:
+        raise HTTPException(status_code=404, detail="Quiz not found")
+
+    answers = await events_frame(
+        {"module_id": module_id, "event_type": "question_answered", **class_filter(user_id)},
+        ["user_id", "item_index", "selected_option", "is_correct", "created_at"],
+    )
+    questions = await asyncio.to_thread(analytics.question_stats, answers, quiz.get("quiz_questions") or [], top_wrong)
+    students = int(answers["user_id"].nunique()) if len(answers) else 0
+    return MongoJSONResponse({"module_id": module_id, "students": students, "questions": questions})
+
+# Content search
+@api_router.get("/search")
+async def search_content(q: str, limit: int = 20):
+    if not 1 <= limit <= 100:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 100")
+    results = search_index.search(q, limit)
+    for result in results:
+        module = curriculum_cache.modules.get(result["module_id"], {})
+        result["module_name"] = module.get("name")
+        result["topic_id"] = module.get("topic_id")
+    return MongoJSONResponse({"query": q, "results": results, "index": search_index.stats()})
+
+# Token bucket rate limits for write endpoints, per user when the route names
+# one and per client IP otherwise. Buckets live in each worker process
+RATE_LIMIT_WRITE_RATE = float(os.environ.get('RATE_LIMIT_WRITE_RATE', '5'))
+RATE_LIMIT_WRITE_BURST = int(os.environ.get('RATE_LIMIT_WRITE_BURST', '30'))
+RATE_LIMIT_ADMIN_PER_MINUTE = float(os.environ.get('RATE_LIMIT_ADMIN_PER_MINUTE', '2'))
+RATE_LIMIT_ADMIN_BURST = int(os.environ.get('RATE_LIMIT_ADMIN_BURST', '2'))
+# Behind an ingress every request comes from the proxy's address; set this when
+# one trusted proxy appends the client address to X-Forwarded-For, as the
+# deployment's ingress does (backend/.env, see CONTENT_DOCUMENTATION.md)
+TRUST_FORWARDED_FOR = os.environ.get('TRUST_FORWARDED_FOR', 'false').lower() == 'true'
+RATE_LIMIT_MAX_CLIENTS = 10000
+
+class TokenBucketLimiter:
+    def __init__(self, rate: float, burst: int, max_clients: int = RATE_LIMIT_MAX_CLIENTS):
+        self.rate = rate  # tokens added per second
+        self.burst = burst
+        self.max_clients = max_clients
+        # client key -> (tokens, monotonic time of the last refill), least recently used first
+        self.buckets: Dict[str, tuple] = {}
+
+    def take(self, key: str) -> float:
+        """Spend a token for `key`; returns 0 when allowed, else the seconds until the next token"""
+        now = time.monotonic()
+        tokens, updated = self.buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        retry_after = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) / self.rate
+        self.buckets[key] = (tokens, now)
+        if len(self.buckets) > self.max_clients:
+            del self.buckets[next(iter(self.buckets))]
+        return retry_after
+
+def client_key(request: Request) -> str:
+    user_id = request.path_params.get("user_id")
+    if user_id:
+        return f"user:{user_id}"
+    forwarded = request.headers.get("x-forwarded-for") if TRUST_FORWARDED_FOR else None
+    if forwarded:
+        # Earlier entries are whatever the client sent; the last one is the address our proxy saw
+        return f"ip:{forwarded.split(',')[-1].strip()}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+def enforce_rate_limit(limiter: TokenBucketLimiter, key: str, scope: str):
+    retry_after = limiter.take(key)
+    if retry_after:
+        metrics.inc("rate_limited_total", (("scope", scope),))
+        raise HTTPException(status_code=429, detail="Too many requests",
+                            headers={"Retry-After": str(math.ceil(retry_after))})
+
+def rate_limit(limiter: TokenBucketLimiter, scope: str):
+    async def check(request: Request):
+        enforce_rate_limit(limiter, client_key(request), scope)
+    return Depends(check)
+
+write_limiter = TokenBucketLimiter(RATE_LIMIT_WRITE_RATE, RATE_LIMIT_WRITE_BURST)
+admin_limiter = TokenBucketLimiter(RATE_LIMIT_ADMIN_PER_MINUTE / 60, RATE_LIMIT_ADMIN_BURST)
+
+# Endpoints that rewrite the curriculum need the admin token, sent as
+# "Authorization: Bearer <token>" or "X-Admin-Token: <token>"
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+
+async def require_admin(request: Request):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=503, detail="Admin endpoints are disabled, set ADMIN_TOKEN")
+    authorization = request.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        token = authorization[7:].strip()
+    else:
+        token = request.headers.get("x-admin-token", "")
+    if not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+ADMIN_ROUTE = [Depends(require_admin), rate_limit(admin_limiter, "admin")]
 
 # User progress endpoints
-@api_router.post("/users", response_model=User)
+@api_router.post("/users", response_model=User, dependencies=[rate_limit(write_limiter, "write")])
 async def create_user(user: User):
     user_dict = user.model_dump(exclude={"id"})
-    result = await db.users.insert_one(user_dict)
-    user.id = str(result.inserted_id)
+    async with user_sessions.start() as session:
+        result = await user_sessions.db.users.insert_one(user_dict, session=session)
+        user.id = str(result.inserted_id)
+        user_sessions.record([user.id], session)
+    known_users.add(user.id)
     return user
 
 @api_router.get("/users/{user_id}", response_model=User)
@@ -206,478 +1859,552 @@ async def get_user(user_id: str):
     if not ObjectId.is_valid(user_id):
         raise HTTPException(status_code=400, detail="Invalid user ID")
     
-    user = await db.users.find_one({"_id": ObjectId(user_id)})
+    # Read-your-writes for progress still sitting in the buffer
+    if progress_buffer.has_pending(user_id):
+        await progress_buffer.flush()
+    async with user_sessions.start(user_id) as session:
+        user = await user_sessions.db.users.find_one({"_id": ObjectId(user_id)}, session=session)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return User(**str_object_id(user))
 
-# Add complete content for 7th grade
-@api_router.post("/initialize-7th-grade-content")
-async def initialize_7th_grade_content():
-    """Add complete content structure for 7th grade"""
-    try:
-        # Get 7th grade ID
-        grade_7 = await db.grades.find_one({"grade_number": 7})
-        if not grade_7:
-            raise HTTPException(status_code=404, detail="7th grade not found")
-        
-        grade_7_id = str(grade_7["_id"])
-
-        # Clear existing topics, modules, and content for 7th grade
-        await db.topics.delete_many({"grade_id": grade_7_id})
-        await db.modules.delete_many({})
-        await db.content.delete_many({})
-
-        # Create topics for 7th grade
-        topics_7_data = [
-            {
-                "grade_id": grade_7_id,
-                "name": "Números Enteros",
-                "description": "Operaciones con números enteros, propiedades y aplicaciones",
-                "icon": "calculator",
-                "order": 1,
-                "is_active": True,
-                "created_at": datetime.utcnow()
-            },
-            {
-                "grade_id": grade_7_id,
-                "name": "Fracciones y Decimales",
-                "description": "Operaciones con fracciones y números decimales",
-                "icon": "pie-chart",
-                "order": 2,
-                "is_active": True,
-                "created_at": datetime.utcnow()
-            },
-            {
-                "grade_id": grade_7_id,
-                "name": "Introducción al Álgebra",
-                "description": "Variables, expresiones algebraicas y ecuaciones simples",
-                "icon": "function",
-                "order": 3,
-                "is_active": True,
-                "created_at": datetime.utcnow()
-            },
-            {
-                "grade_id": grade_7_id,
-                "name": "Geometría Básica",
-                "description": "Figuras geométricas, área y perímetro",
-                "icon": "triangle",
-                "order": 4,
-                "is_active": True,
-                "created_at": datetime.utcnow()
-            },
-            {
-                "grade_id": grade_7_id,
-                "name": "Proporciones y Porcentajes",
-                "description": "Razones, proporciones y cálculo de porcentajes",
-                "icon": "percent",
-                "order": 5,
-                "is_active": True,
-                "created_at": datetime.utcnow()
-            }
-        ]
+# Events only quiz grading writes; clients cannot post them, so the
+# leaderboard points and best quiz scores built from them are earned
+GRADED_EVENTS = ("question_answered", "quiz_scored")
 
-        # Create placeholder topics for grades 8-12
-        other_grades = await db.grades.find({"grade_number": {"$gt": 7}}).to_list(10)
-        for grade in other_grades:
-            grade_id = str(grade["_id"])
-            grade_num = grade["grade_number"]
-            grade_topics = [
-                {
-                    "grade_id": grade_id,
-                    "name": f"Tema 1 - Grado {grade_num}",
-                    "description": f"Primer tema del grado {grade_num} - Por completar",
-                    "icon": "book",
-                    "order": 1,
-                    "is_active": True,
-                    "created_at": datetime.utcnow()
-                },
-                {
-                    "grade_id": grade_id,
-                    "name": f"Tema 2 - Grado {grade_num}",
-                    "description": f"Segundo tema del grado {grade_num} - Por completar",
-                    "icon": "book",
-                    "order": 2,
-                    "is_active": True,
-                    "created_at": datetime.utcnow()
-                },
-                {
-                    "grade_id": grade_id,
-                    "name": f"Tema 3 - Grado {grade_num}",
-                    "description": f"Tercer tema del grado {grade_num} - Por completar",
-                    "icon": "book",
-                    "order": 3,
-                    "is_active": True,
-                    "created_at": datetime.utcnow()
-                }
-            ]
-            topics_7_data.extend(grade_topics)
-
-        # Insert all topics
-        topics_result = await db.topics.insert_many(topics_7_data)
-        
-        # Get 7th grade topic IDs
-        grade_7_topic_ids = [str(topic_id) for topic_id in topics_result.inserted_ids[:5]]
-
-        # Create modules for 7th grade first topic (Números Enteros) - Complete
-        integers_modules = [
-            {
-                "topic_id": grade_7_topic_ids[0],
-                "name": "Definición y Clasificación",
-                "description": "Qué son los números enteros y cómo se clasifican",
-                "order": 1,
-                "is_active": True,
-                "created_at": datetime.utcnow()
-            },
-            {
-                "topic_id": grade_7_topic_ids[0],
-                "name": "Suma y Resta",
-                "description": "Operaciones de suma y resta con números enteros",
-                "order": 2,
-                "is_active": True,
-                "created_at": datetime.utcnow()
-            },
-            {
-                "topic_id": grade_7_topic_ids[0],
-                "name": "Multiplicación y División",
-                "description": "Operaciones de multiplicación y división con números enteros",
-                "order": 3,
-                "is_active": True,
-                "created_at": datetime.utcnow()
-            },
-            {
-                "topic_id": grade_7_topic_ids[0],
-                "name": "Orden y Comparación",
-                "description": "Cómo ordenar y comparar números enteros",
-                "order": 4,
-                "is_active": True,
-                "created_at": datetime.utcnow()
-            }
-        ]
+@api_router.post("/users/{user_id}/progress", status_code=202, dependencies=[rate_limit(write_limiter, "write")])
+async def record_progress(user_id: str, report: ProgressReport):
+    if not ObjectId.is_valid(user_id):
+        raise HTTPException(status_code=400, detail="Invalid user ID")
+    if not ObjectId.is_valid(report.module_id):
+        raise HTTPException(status_code=400, detail="Invalid module ID")
+    if report.event_type in GRADED_EVENTS:
+        raise HTTPException(status_code=400, detail=f"{report.event_type} is recorded by quiz grading")
+    if report.event_type == "exercise_answered" and report.is_correct is None:
+        raise HTTPException(status_code=400, detail=f"is_correct is required for {report.event_type}")
 
-        # Create placeholder modules for other 7th grade topics
-        placeholder_modules = []
-        for i, topic_id in enumerate(grade_7_topic_ids[1:], 1):
-            topic_modules = [
-                {
-                    "topic_id": topic_id,
-                    "name": f"Módulo 1",
-                    "description": f"Primer módulo del tema {i+1} - Por completar",
-                    "order": 1,
-                    "is_active": True,
-                    "created_at": datetime.utcnow()
-                },
-                {
-                    "topic_id": topic_id,
-                    "name": f"Módulo 2",
-                    "description": f"Segundo módulo del tema {i+1} - Por completar",
-                    "order": 2,
-                    "is_active": True,
-                    "created_at": datetime.utcnow()
-                }
-            ]
-            placeholder_modules.extend(topic_modules)
-
-        # Insert modules
-        all_modules = integers_modules + placeholder_modules
-        modules_result = await db.modules.insert_many(all_modules)
-        
-        # Get first module ID (Definición y Clasificación)
-        first_module_id = str(modules_result.inserted_ids[0])
-
-        # Create complete content for first module
-        content_data = [
-            # Glossary
-            {
-                "module_id": first_module_id,
-                "content_type": "glossary",
-                "title": "Glosario - Números Enteros",
-                "glossary_terms": [
-                    {
-                        "term": "Número Entero",
-                        "definition": "Conjunto de números que incluye los naturales, sus opuestos negativos y el cero",
-                        "example": "..., -3, -2, -1, 0, 1, 2, 3, ..."
-                    },
-                    {
-                        "term": "Números Naturales",
-                        "definition": "Números positivos que se usan para contar",
-                        "example": "1, 2, 3, 4, 5, ..."
-                    },
-                    {
-                        "term": "Números Negativos",
-                        "definition": "Números menores que cero, representados con el signo menos",
-                        "example": "-1, -2, -3, -4, ..."
-                    },
-                    {
-                        "term": "Valor Absoluto",
-                        "definition": "Distancia de un número entero al cero, siempre positiva",
-                        "example": "|−3| = 3, |5| = 5"
-                    },
-                    {
-                        "term": "Opuesto",
-                        "definition": "Número que tiene el mismo valor absoluto pero signo contrario",
-                        "example": "El opuesto de 7 es -7"
-                    }
-                ],
-                "created_at": datetime.utcnow()
-            },
-            # Theory
-            {
-                "module_id": first_module_id,
-                "content_type": "theory",
-                "title": "Teoría - Definición y Clasificación de Números Enteros",
-                "theory_content": """# Números Enteros - Definición y Clasificación
-
-## ¿Qué son los números enteros?
-
-Los números enteros son una extensión de los números naturales que incluye:
-- Los números naturales: 1, 2, 3, 4, 5, ...
-- El cero: 0
-- Los números negativos: -1, -2, -3, -4, -5, ...
-
-**Conjunto de números enteros**: Z = {..., -3, -2, -1, 0, 1, 2, 3, ...}
-
-## Clasificación de los números enteros
-
-### 1. Números enteros positivos
-Son los números naturales: 1, 2, 3, 4, 5, ...
-- También se pueden escribir como +1, +2, +3, ...
-- Se ubican a la derecha del cero en la recta numérica
-
-### 2. El cero (0)
-- Es neutro, no es positivo ni negativo
-- Separa los números positivos de los negativos
-- Es el centro de la recta numérica
-
-### 3. Números enteros negativos
-Son: -1, -2, -3, -4, -5, ...
-- Se ubican a la izquierda del cero en la recta numérica
-- Representan cantidades menores que cero
-
-## La recta numérica
-
-En la recta numérica, los números enteros se ordenan de menor a mayor:
-- Los números negativos están a la izquierda del cero
-- Los números positivos están a la derecha del cero
-- Mientras más a la derecha, mayor es el número
-- Mientras más a la izquierda, menor es el número
-
-## Valor absoluto
-
-El valor absoluto de un número entero es su distancia al cero, sin considerar el signo.
-- Se representa con barras verticales: |a|
-- Siempre es positivo o cero
-- |5| = 5, |-5| = 5, |0| = 0
-
-## Números opuestos
-
-Dos números son opuestos si tienen el mismo valor absoluto pero signos diferentes.
-- El opuesto de 7 es -7
-- El opuesto de -3 es 3
-- El opuesto de 0 es 0""",
-                "created_at": datetime.utcnow()
-            },
-            # Learning Exercises
-            {
-                "module_id": first_module_id,
-                "content_type": "learning_exercises",
-                "title": "Ejercicios de Aprendizaje - Números Enteros",
-                "exercises": [
-                    {
-                        "problem": "¿Cuál de los siguientes números NO es un número entero?",
-                        "options": [
-                            {"option_text": "-5", "is_correct": False},
-                            {"option_text": "0", "is_correct": False},
-                            {"option_text": "3.5", "is_correct": True},
-                            {"option_text": "7", "is_correct": False}
-                        ],
-                        "difficulty": "easy",
-                        "explanation": "3.5 no es un número entero porque tiene parte decimal. Los números enteros son: ..., -2, -1, 0, 1, 2, ..."
-                    },
-                    {
-                        "problem": "¿Cuál es el valor absoluto de -8?",
-                        "options": [
-                            {"option_text": "-8", "is_correct": False},
-                            {"option_text": "8", "is_correct": True},
-                            {"option_text": "0", "is_correct": False},
-                            {"option_text": "16", "is_correct": False}
-                        ],
-                        "difficulty": "easy",
-                        "explanation": "El valor absoluto de -8 es 8, porque representa la distancia de -8 al cero en la recta numérica."
-                    },
-                    {
-                        "problem": "¿Cuál es el opuesto de -12?",
-                        "options": [
-                            {"option_text": "-12", "is_correct": False},
-                            {"option_text": "12", "is_correct": True},
-                            {"option_text": "0", "is_correct": False},
-                            {"option_text": "24", "is_correct": False}
-                        ],
-                        "difficulty": "easy",
-                        "explanation": "El opuesto de -12 es 12, porque tienen el mismo valor absoluto pero signos contrarios."
-                    }
-                ],
-                "created_at": datetime.utcnow()
-            },
-            # Practice Exercises
-            {
-                "module_id": first_module_id,
-                "content_type": "practice_exercises",
-                "title": "Ejercicios de Práctica - Números Enteros",
-                "exercises": [
-                    {
-                        "problem": "Ordena de menor a mayor: -3, 5, -1, 0, 2",
-                        "options": [
-                            {"option_text": "-3, -1, 0, 2, 5", "is_correct": True},
-                            {"option_text": "5, 2, 0, -1, -3", "is_correct": False},
-                            {"option_text": "-1, -3, 0, 2, 5", "is_correct": False},
-                            {"option_text": "-3, -1, 2, 0, 5", "is_correct": False}
-                        ],
-                        "difficulty": "medium",
-                        "explanation": "En la recta numérica, de izquierda a derecha (menor a mayor): -3, -1, 0, 2, 5"
-                    },
-                    {
-                        "problem": "Si |x| = 7 y x es negativo, ¿cuál es el valor de x?",
-                        "options": [
-                            {"option_text": "7", "is_correct": False},
-                            {"option_text": "-7", "is_correct": True},
-                            {"option_text": "0", "is_correct": False},
-                            {"option_text": "14", "is_correct": False}
-                        ],
-                        "difficulty": "medium",
-                        "explanation": "Si |x| = 7 y x es negativo, entonces x = -7, porque |-7| = 7"
-                    },
-                    {
-                        "problem": "¿Entre qué números enteros consecutivos está ubicado el cero?",
-                        "options": [
-                            {"option_text": "Entre -1 y 1", "is_correct": True},
-                            {"option_text": "Entre 0 y 1", "is_correct": False},
-                            {"option_text": "Entre -2 y 2", "is_correct": False},
-                            {"option_text": "No está entre números consecutivos", "is_correct": False}
-                        ],
-                        "difficulty": "hard",
-                        "explanation": "El cero está entre -1 y 1, que son números enteros consecutivos."
-                    }
-                ],
-                "created_at": datetime.utcnow()
-            },
-            # Quiz
-            {
-                "module_id": first_module_id,
-                "content_type": "quiz",
-                "title": "Quiz - Números Enteros: Definición y Clasificación",
-                "quiz_questions": [
-                    {
-                        "question": "Los números enteros incluyen:",
-                        "options": [
-                            {"option_text": "Solo números positivos", "is_correct": False},
-                            {"option_text": "Solo números negativos", "is_correct": False},
-                            {"option_text": "Números positivos, negativos y el cero", "is_correct": True},
-                            {"option_text": "Solo números decimales", "is_correct": False}
-                        ],
-                        "explanation": "Los números enteros incluyen los números positivos (1,2,3...), negativos (-1,-2,-3...) y el cero."
-                    },
-                    {
-                        "question": "En la recta numérica, ¿dónde se ubican los números negativos?",
-                        "options": [
-                            {"option_text": "A la derecha del cero", "is_correct": False},
-                            {"option_text": "A la izquierda del cero", "is_correct": True},
-                            {"option_text": "En el mismo lugar que el cero", "is_correct": False},
-                            {"option_text": "No se pueden ubicar", "is_correct": False}
-                        ],
-                        "explanation": "Los números negativos se ubican a la izquierda del cero en la recta numérica."
-                    },
-                    {
-                        "question": "¿Cuál es el valor de |-15|?",
-                        "options": [
-                            {"option_text": "-15", "is_correct": False},
-                            {"option_text": "15", "is_correct": True},
-                            {"option_text": "0", "is_correct": False},
-                            {"option_text": "30", "is_correct": False}
-                        ],
-                        "explanation": "El valor absoluto de -15 es 15, porque representa la distancia de -15 al cero."
-                    },
-                    {
-                        "question": "Dos números son opuestos cuando:",
-                        "options": [
-                            {"option_text": "Tienen diferente valor absoluto", "is_correct": False},
-                            {"option_text": "Tienen el mismo valor absoluto y diferentes signos", "is_correct": True},
-                            {"option_text": "Son ambos positivos", "is_correct": False},
-                            {"option_text": "Son ambos negativos", "is_correct": False}
-                        ],
-                        "explanation": "Dos números son opuestos cuando tienen el mismo valor absoluto pero signos diferentes, como 5 y -5."
-                    },
-                    {
-                        "question": "¿Cuál número es mayor: -10 o -5?",
-                        "options": [
-                            {"option_text": "-10", "is_correct": False},
-                            {"option_text": "-5", "is_correct": True},
-                            {"option_text": "Son iguales", "is_correct": False},
-                            {"option_text": "No se pueden comparar", "is_correct": False}
-                        ],
-                        "explanation": "-5 es mayor que -10 porque está más cerca del cero y más a la derecha en la recta numérica."
-                    }
-                ],
-                "created_at": datetime.utcnow()
-            }
-        ]
+    await curriculum_cache.ensure_loaded()
+    if report.module_id not in curriculum_cache.modules:
+        raise HTTPException(status_code=404, detail="Module not found")
+    if not await known_users.exists(user_id):
+        raise HTTPException(status_code=404, detail="User not found")
+
+    # Any created_at the client sent is ignored; it would order answers and pin last_activity_at
+    event = ProgressEvent(**report.model_dump())
+    progress_buffer.add(user_id, event)
+    mastery_tracker.observe(user_id, event)
+    return {"status": "queued"}
+
+# Adaptive practice: a rolling mastery estimate per user and module, kept in
+# memory, picks which difficulty pool the next exercises come from
+MASTERY_ALPHA = float(os.environ.get('MASTERY_ALPHA', '0.3'))
+MASTERY_MAX_ENTRIES = 100000
+RECENT_EXERCISES = 5
+MAX_NEXT_EXERCISES = 20
 
-        # Insert content
-        content_result = await db.content.insert_many(content_data)
+class MasteryTracker:
+    def __init__(self, alpha: float, max_entries: int):
+        self.alpha = alpha
+        self.max_entries = max_entries
+        # (user_id, module_id) -> {"mastery", "recent"}, least recently used first
+        self.estimates: Dict[tuple, dict] = {}
 
+    def get(self, user_id: str, module_id: str) -> Optional[dict]:
+        entry = self.estimates.pop((user_id, module_id), None)
+        if entry is not None:
+            self.estimates[(user_id, module_id)] = entry
+        return entry
+
+    def seed(self, user_id: str, module_id: str, correct: int, answered: int) -> dict:
+        """Start from the stored progress, smoothed towards 0.5 for students with few answers"""
+        entry = {"mastery": (correct + 1) / (answered + 2), "recent": []}
+        self.estimates[(user_id, module_id)] = entry
+        if len(self.estimates) > self.max_entries:
+            del self.estimates[next(iter(self.estimates))]
+        return entry
+
+    def observe(self, user_id: str, event: ProgressEvent):
+        if event.event_type != "exercise_answered":
+            return
+        # Users not tracked yet are seeded from their stored progress on their next selection
+        entry = self.get(user_id, event.module_id)
+        if entry is None:
+            return
+        entry["mastery"] += self.alpha * ((1.0 if event.is_correct else 0.0) - entry["mastery"])
+        if event.content_type == "practice_exercises" and event.item_index is not None:
+            entry["recent"] = (entry["recent"] + [event.item_index])[-RECENT_EXERCISES:]
+
+    def stats(self):
+        return {"tracked": len(self.estimates)}
+
+mastery_tracker = MasteryTracker(MASTERY_ALPHA, MASTERY_MAX_ENTRIES)
+
+def target_difficulty(mastery: float) -> str:
+    if mastery < 0.5:
+        return "easy"
+    return "medium" if mastery < 0.8 else "hard"
+
+def pick_exercises(pool: dict, mastery: float, recent: List[int], n: int) -> List[int]:
+    """Indexes of up to n exercises, from the target difficulty outwards, skipping recent ones if possible"""
+    target = DIFFICULTIES.index(target_difficulty(mastery))
+    order = sorted(DIFFICULTIES, key=lambda difficulty: abs(DIFFICULTIES.index(difficulty) - target))
+    picked: List[int] = []
+    for skip_recent in (True, False):
+        for difficulty in order:
+            candidates = [i for i in pool["pools"][difficulty] if i not in picked and not (skip_recent and i in recent)]
+            picked += random.sample(candidates, min(len(candidates), n - len(picked)))
+            if len(picked) == n:
+                return picked
+    return picked
+
+@api_router.get("/users/{user_id}/modules/{module_id}/next-exercises")
+async def next_exercises(user_id: str, module_id: str, n: int = 3):
+    if not ObjectId.is_valid(user_id):
+        raise HTTPException(status_code=400, detail="Invalid user ID")
+    if not ObjectId.is_valid(module_id):
+        raise HTTPException(status_code=400, detail="Invalid module ID")
+    if not 1 <= n <= MAX_NEXT_EXERCISES:
+        raise HTTPException(status_code=400, detail=f"n must be between 1 and {MAX_NEXT_EXERCISES}")
+
+    pool = content_snapshots.exercise_pools.get(module_id)
+    if pool is None and not content_snapshots.is_published(module_id):
+        practice = await secondary_db.content.find_one({"module_id": module_id, "content_type": "practice_exercises"})
+        pool = exercise_pool(practice) if practice else None
+    if not pool or not pool["exercises"]:
+        raise HTTPException(status_code=404, detail="Practice exercises not found")
+
+    entry = mastery_tracker.get(user_id, module_id)
+    if entry is None:
+        async with user_sessions.start(user_id) as session:
+            user = await user_sessions.db.users.find_one(
+                {"_id": ObjectId(user_id)}, {f"progress.modules.{module_id}": 1}, session=session
+            )
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        progress = user.get("progress", {}).get("modules", {}).get(module_id, {})
+        entry = mastery_tracker.seed(user_id, module_id, progress.get("exercises_correct", 0), progress.get("exercises_answered", 0))
+
+    indexes = pick_exercises(pool, entry["mastery"], entry["recent"], n)
+    return MongoJSONResponse({
+        "module_id": module_id,
+        "mastery": round(entry["mastery"], 4),
+        "target_difficulty": target_difficulty(entry["mastery"]),
+        "exercises": [{"item_index": i, **pool["exercises"][i]} for i in indexes],
+    })
+
+# Parametric practice for the integer modules: sets are regenerated from
+# (template, seed); chunks of sets requested with an explicit seed are kept in
+# an LRU cache, the rest are generated for the page and dropped
+GENERATED_SET_SIZE = int(os.environ.get('GENERATED_SET_SIZE', '1000'))
+GENERATED_CHUNK_CACHE = int(os.environ.get('GENERATED_CHUNK_CACHE', '1000'))
+MAX_SEED = 2**32 - 1
+generated_sets = GeneratedSets(GENERATED_CHUNK_CACHE)
+
+@api_router.get("/exercise-templates")
+async def list_exercise_templates():
+    await curriculum_cache.ensure_loaded()
+    module_ids = {module["name"]: module_id for module_id, module in curriculum_cache.modules.items()}
+    return [
+        {"name": template.name, "module_name": template.module_name, "module_id": module_ids.get(template.module_name)}
+        for template in TEMPLATES.values()
+    ]
+
+@api_router.get("/modules/{module_id}/generated-exercises")
+async def get_generated_exercises(module_id: str, seed: Optional[int] = None, offset: int = 0, n: int = 10,
+                                  difficulty: Optional[str] = None):
+    """A page of generated exercises; the same seed always yields the same set"""
+    if not ObjectId.is_valid(module_id):
+        raise HTTPException(status_code=400, detail="Invalid module ID")
+    if seed is not None and not 0 <= seed <= MAX_SEED:
+        raise HTTPException(status_code=400, detail=f"seed must be between 0 and {MAX_SEED}")
+    if not 0 <= offset < GENERATED_SET_SIZE:
+        raise HTTPException(status_code=400, detail=f"offset must be between 0 and {GENERATED_SET_SIZE - 1}")
+    if not 1 <= n <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"n must be between 1 and {MAX_PAGE_SIZE}")
+    if difficulty is not None and difficulty not in DIFFICULTIES:
+        raise HTTPException(status_code=400, detail=f"difficulty must be one of {', '.join(DIFFICULTIES)}")
+
+    await curriculum_cache.ensure_loaded()
+    module = curriculum_cache.modules.get(module_id)
+    if not module:
+        raise HTTPException(status_code=404, detail="Module not found")
+    template = template_for_module(module["name"])
+    if not template:
+        raise HTTPException(status_code=404, detail="No exercise template for this module")
+
+    # A random seed is a one-off set, not worth a cache entry
+    explicit = seed is not None
+    if seed is None:
+        seed = random.randint(0, MAX_SEED)
+    indexes = range(GENERATED_SET_SIZE)
+    if difficulty is not None:
+        indexes = indexes[DIFFICULTIES.index(difficulty)::len(DIFFICULTIES)]
+    page = indexes[offset:offset + n]
+    exercises = generated_sets.get(template, seed, page, cache=explicit)
+    return MongoJSONResponse({
+        "module_id": module_id,
+        "template": template.name,
+        "seed": seed,
+        "offset": offset,
+        "total": len(indexes),
+        "exercises": [{"item_index": i, **e} for i, e in zip(page, exercises)],
+    })
+
+# Dashboards over the materialized progress summaries
+LEADERBOARD_SIZE = 10
+COMPLETION_SCORE = float(os.environ.get('COMPLETION_SCORE', '0.8'))
+
+def topic_completion(summary: dict) -> dict:
+    """A module counts as completed once its best quiz score reaches COMPLETION_SCORE"""
+    modules = curriculum_cache.modules_by_topic.get(summary["topic_id"], [])
+    best = summary.get("best_quiz_scores") or {}
+    completed = sum(1 for module in modules if best.get(module["_id"], 0) >= COMPLETION_SCORE)
+    return {
+        **{counter: 0 for counter in TOPIC_COUNTERS},
+        "best_quiz_scores": {},
+        **{k: v for k, v in summary.items() if k != "_id"},
+        "modules": len(modules),
+        "modules_completed": completed,
+        "completion": completed / len(modules) if modules else 0.0,
+    }
+
+@api_router.get("/topics/{topic_id}/progress")
+async def get_topic_progress(topic_id: str, response: Response, user_id: Optional[str] = None,
+                             after: Optional[str] = None, limit: int = MAX_PAGE_SIZE):
+    """Class dashboard: every student's progress in one topic, paged by user_id"""
+    if not ObjectId.is_valid(topic_id):
+        raise HTTPException(status_code=400, detail="Invalid topic ID")
+    if user_id is not None and not ObjectId.is_valid(user_id):
+        raise HTTPException(status_code=400, detail="Invalid user ID")
+    if after is not None and not ObjectId.is_valid(after):
+        raise HTTPException(status_code=400, detail="Invalid after value")
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    await curriculum_cache.ensure_loaded()
+    if topic_id not in curriculum_cache.topics:
+        raise HTTPException(status_code=404, detail="Topic not found")
+
+    query: Dict[str, Any] = {"topic_id": topic_id}
+    user_filter = {}
+    if user_id is not None:
+        user_filter["$eq"] = user_id
+    if after is not None:
+        user_filter["$gt"] = after
+    if user_filter:
+        query["user_id"] = user_filter
+    # Fetch one extra summary to know whether there is a next page
+    summaries = await secondary_db.topic_progress.find(query).sort("user_id", 1).limit(limit + 1).to_list(None)
+    summaries = keyset_page(summaries, "user_id", None, limit, response)
+    return fast_response([topic_completion(summary) for summary in summaries], response)
+
+@api_router.get("/users/{user_id}/grades/{grade_id}/progress")
+async def get_user_grade_progress(user_id: str, grade_id: str):
+    """One student's completion of every topic in a grade"""
+    if not ObjectId.is_valid(user_id):
+        raise HTTPException(status_code=400, detail="Invalid user ID")
+    if not ObjectId.is_valid(grade_id):
+        raise HTTPException(status_code=400, detail="Invalid grade ID")
+    await curriculum_cache.ensure_loaded()
+    if grade_id not in curriculum_cache.grades:
+        raise HTTPException(status_code=404, detail="Grade not found")
+
+    async with user_sessions.start(user_id) as session:
+        cursor = user_sessions.db.topic_progress.find({"user_id": user_id, "grade_id": grade_id}, session=session)
+        summaries = await cursor.to_list(None)
+    by_topic = {summary["topic_id"]: summary for summary in summaries}
+    return MongoJSONResponse([
+        topic_completion(by_topic.get(topic["_id"], {"user_id": user_id, "topic_id": topic["_id"], "grade_id": grade_id}))
+        for topic in curriculum_cache.topics_by_grade.get(grade_id, [])
+    ])
+
+@api_router.get("/grades/{grade_id}/leaderboard")
+async def get_grade_leaderboard(grade_id: str, limit: int = LEADERBOARD_SIZE):
+    if not ObjectId.is_valid(grade_id):
+        raise HTTPException(status_code=400, detail="Invalid grade ID")
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    entries = await secondary_db.grade_leaderboard.find({"grade_id": grade_id}, {"_id": 0}).sort("points", -1).limit(limit).to_list(None)
+    user_ids = [ObjectId(entry["user_id"]) for entry in entries if ObjectId.is_valid(entry["user_id"])]
+    names = {str(user["_id"]): user.get("name") async for user in secondary_db.users.find({"_id": {"$in": user_ids}}, {"name": 1})}
+    return MongoJSONResponse([
+        {"rank": rank, **entry, "name": names.get(entry["user_id"])} for rank, entry in enumerate(entries, 1)
+    ])
+
+# Recompute the summaries from the stored progress events
+@api_router.post("/summaries/rebuild", dependencies=ADMIN_ROUTE)
+async def rebuild_progress_summaries():
+    await progress_buffer.flush()
+    return await rebuild_summaries(db)
+
+@api_router.get("/progress/stats")
+async def progress_stats():
+    return {
+        **progress_buffer.stats(),
+        "mastery": mastery_tracker.stats(),
+        "sessions": user_sessions.stats(),
+        "known_users": known_users.stats(),
+    }
+
+# Seed imports run as background jobs, one at a time across all workers;
+# /api/import holds the same lock while it runs, so a pruning seed job never
+# deletes what a concurrent import just wrote. Job documents live in Mongo so
+# any worker can report their progress. The import
+# upserts in place (inside a transaction on replica sets) and the snapshots are
+# swapped in when it finishes, so readers keep the previous curriculum meanwhile
+JOB_HEARTBEAT_INTERVAL = 1.0
+JOB_STALE_AFTER = int(os.environ.get('JOB_STALE_AFTER', '60'))
+
+class SeedJobs:
+    def __init__(self):
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    async def acquire(self, kind: str) -> dict:
+        """Insert an active job document, or raise 409 while another job holds the lock"""
+        now = datetime.utcnow()
+        if self._tasks:
+            raise HTTPException(status_code=409, detail=f"Seed job {next(iter(self._tasks))} is already running")
+        # A job whose worker died stops sending heartbeats
+        await db.jobs.update_many(
+            {"active": True, "heartbeat_at": {"$lt": now - timedelta(seconds=JOB_STALE_AFTER)}},
+            {"$set": {"status": "failed", "error": "Abandoned by its worker", "finished_at": now}, "$unset": {"active": ""}},
+        )
+        job = {"_id": uuid.uuid4().hex, "kind": kind, "status": "running", "active": True,
+               "records_total": 0, "records_done": 0, "created_at": now, "heartbeat_at": now}
+        try:
+            await db.jobs.insert_one(job)
+        except DuplicateKeyError:
+            running = await db.jobs.find_one({"active": True}, {"_id": 1})
+            raise HTTPException(status_code=409, detail=f"Seed job {running['_id'] if running else ''} is already running")
+        return job
+
+    async def submit(self, kind: str, path: Path, summarize) -> dict:
+        job = await self.acquire(kind)
+        task = asyncio.create_task(self._run(job["_id"], path, summarize))
+        self._tasks[job["_id"]] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job["_id"], None))
+        return job
+
+    async def track(self, job_id: str, records: AsyncIterator[dict]):
+        """Pass records through, reporting progress and keeping the job's heartbeat fresh"""
+        reported = time.monotonic()
+        done = 0
+        async for record in records:
+            done += 1
+            yield record
+            if time.monotonic() - reported >= JOB_HEARTBEAT_INTERVAL:
+                reported = time.monotonic()
+                await db.jobs.update_one({"_id": job_id}, {"$set": {"records_done": done, "heartbeat_at": datetime.utcnow()}})
+
+    async def finish(self, job_id: str, update: Dict[str, Any]):
+        await db.jobs.update_one({"_id": job_id}, {"$set": {**update, "finished_at": datetime.utcnow()}, "$unset": {"active": ""}})
+
+    async def _run(self, job_id: str, path: Path, summarize):
+        try:
+            records = await asyncio.to_thread(lambda: list(iter_json_records(orjson.loads(path.read_bytes()))))
+            await db.jobs.update_one({"_id": job_id}, {"$set": {"records_total": len(records)}})
+            importer = await import_curriculum(db, self.track(job_id, aiter_records(records)), client=client, prune=True, models=RECORD_MODELS)
+            await refresh_after_import(importer)
+            await self.finish(job_id, {"status": "succeeded", "records_done": len(records), "result": summarize(importer)})
+        except asyncio.CancelledError:
+            await self.finish(job_id, {"status": "failed", "error": "Interrupted by shutdown"})
+            raise
+        except Exception as e:
+            logger.exception("Seed job %s failed", job_id)
+            await republish_after_failure(f"seed job {job_id}")
+            await self.finish(job_id, {"status": "failed", "error": str(e)})
+        finally:
+            curriculum_cache.invalidate()
+
+    async def stop(self):
+        for task in list(self._tasks.values()):
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+seed_jobs = SeedJobs()
+
+# Add complete content for 7th grade
+@api_router.post("/initialize-7th-grade-content", status_code=202, response_model=SeedJob, dependencies=ADMIN_ROUTE)
+async def initialize_7th_grade_content():
+    """Add complete content structure for 7th grade"""
+    def summarize(importer):
         return {
-            "message": f"7th grade content initialized successfully!",
-            "topics_created": len(topics_result.inserted_ids),
-            "modules_created": len(modules_result.inserted_ids),
-            "content_created": len(content_result.inserted_ids)
+            "message": "7th grade content initialized successfully!",
+            "topics_created": importer.stats["topic"]["records"],
+            "modules_created": importer.stats["module"]["records"],
+            "content_created": importer.stats["content"]["records"],
         }
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error initializing 7th grade content: {str(e)}")
+    return await seed_jobs.submit("initialize-7th-grade-content", SEED_DIR / "curriculum.json", summarize)
+
+@api_router.get("/jobs/{job_id}", response_model=SeedJob, dependencies=[Depends(require_admin)])
+async def get_job(job_id: str):
+    job = await db.jobs.find_one({"_id": job_id})
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return SeedJob(**job)
+
+# Import a JSON or NDJSON curriculum file
+@api_router.post("/import", dependencies=ADMIN_ROUTE)
+async def import_curriculum_file(request: Request, prune: bool = False, batch_size: int = 500):
+    """Upsert curriculum records keyed on grade number, topic order, module order and content type"""
+    if "ndjson" in request.headers.get("content-type", ""):
+        records = iter_ndjson_chunks(request.stream())
+    else:
+        try:
+            records = aiter_records(iter_json_records(orjson.loads(await request.body())))
+        except (orjson.JSONDecodeError, CurriculumImportError) as e:
+            raise HTTPException(status_code=400, detail=f"Invalid curriculum file: {str(e)}")
+
+    job = await seed_jobs.acquire("import")
+    update: Dict[str, Any] = {"status": "failed", "error": "Interrupted"}
+    try:
+        try:
+            importer = await import_curriculum(db, seed_jobs.track(job["_id"], records), client=client,
+                                               prune=prune, batch_size=batch_size, models=RECORD_MODELS)
+        except Exception as e:
+            update["error"] = str(e)
+            await republish_after_failure("import")
+            if isinstance(e, (CurriculumImportError, KeyError, ValueError)):
+                raise HTTPException(status_code=400, detail=f"Invalid curriculum file: {str(e)}")
+            raise
+        await refresh_after_import(importer)
+        update = {"status": "succeeded", "records_done": sum(level["records"] for level in importer.stats.values()),
+                  "result": importer.summary()}
+    finally:
+        await seed_jobs.finish(job["_id"], update)
+    return importer.summary()
 
 # Test endpoint to check database connection
 @api_router.get("/test-db")
 async def test_db():
     try:
-        # Try to count documents in grades collection
-        count = await db.grades.count_documents({})
+        # Collection metadata count, no scan of the grades collection
+        count = await db.grades.estimated_document_count()
         return {"status": "success", "grades_count": count, "db_name": db.name}
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
-# Initialize database with sample data
-@api_router.post("/initialize-data")
-async def initialize_data():
-    """Initialize the database with grade structure and 7th grade content"""
+# Cheap readiness check: a ping round-trip plus connection pool metrics
+@api_router.get("/health")
+async def health():
     try:
-        # Clear existing data
-        await db.grades.delete_many({})
-        await db.topics.delete_many({})
-        await db.modules.delete_many({})
-        await db.content.delete_many({})
-
-        # Create grades 7-12
-        grades_data = [
-            {"grade_number": 7, "grade_name": "7mo Grado", "description": "Séptimo grado - Fundamentos de álgebra y geometría", "is_active": True, "created_at": datetime.utcnow()},
-            {"grade_number": 8, "grade_name": "8vo Grado", "description": "Octavo grado - Álgebra intermedia y funciones", "is_active": True, "created_at": datetime.utcnow()},
-            {"grade_number": 9, "grade_name": "9no Grado", "description": "Noveno grado - Álgebra avanzada y geometría analítica", "is_active": True, "created_at": datetime.utcnow()},
-            {"grade_number": 10, "grade_name": "10mo Grado", "description": "Décimo grado - Funciones y trigonometría", "is_active": True, "created_at": datetime.utcnow()},
-            {"grade_number": 11, "grade_name": "11mo Grado", "description": "Undécimo grado - Precálculo y estadística", "is_active": True, "created_at": datetime.utcnow()},
-            {"grade_number": 12, "grade_name": "12mo Grado", "description": "Duodécimo grado - Cálculo y matemáticas avanzadas", "is_active": True, "created_at": datetime.utcnow()}
-        ]
+        started = time.perf_counter()
+        await client.admin.command("ping")
+        ping_ms = (time.perf_counter() - started) * 1000
+    except Exception as e:
+        return MongoJSONResponse({"status": "error", "message": str(e), "pool": pool_metrics.stats()}, status_code=503)
+    return {"status": "ok", "ping_ms": round(ping_ms, 2), "pool": pool_metrics.stats()}
 
-        # Insert grades
-        grades_result = await db.grades.insert_many(grades_data)
-        grade_7_id = str(grades_result.inserted_ids[0])
+# Verify with explain() that every query shape is served by an index
+@api_router.get("/indexes/check", dependencies=[Depends(require_admin)])
+async def check_indexes():
+    results = []
+    for collection, query, sort in INDEXED_QUERIES:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = await cursor.explain()
+        winning_plan = explain["queryPlanner"]["winningPlan"]
+        # Slot-based engine plans nest the classic plan under "queryPlan"
+        stages = plan_stages(winning_plan.get("queryPlan", winning_plan))
+        results.append({
+            "collection": collection,
+            "filter": query,
+            "sort": sort,
+            "stages": stages,
+            "uses_index": "IXSCAN" in stages and "COLLSCAN" not in stages,
+        })
+    return {"all_indexed": all(r["uses_index"] for r in results), "queries": results}
 
-        return {"message": f"Database initialized successfully! Created {len(grades_result.inserted_ids)} grades. Grade 7 ID: {grade_7_id}"}
+# Curriculum cache statistics
+@api_router.get("/cache/stats")
+async def cache_stats():
+    return {
+        **curriculum_cache.stats(),
+        "snapshots": content_snapshots.stats(),
+        "bundles": grade_bundles.stats(),
+        "content_reads": content_reads.stats(),
+        "watcher": curriculum_watcher.stats(),
+        "generated_exercises": generated_sets.stats(),
+    }
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error initializing database: {str(e)}")
+# Rebuild the published content snapshots
+@api_router.post("/publish", dependencies=ADMIN_ROUTE)
+async def publish_content():
+    await curriculum_watcher.apply({"revision": await bump_revision(db), "modules": None})
+    return content_snapshots.stats()
+
+# Export the whole curriculum as NDJSON records in the importer's format
+async def export_records():
+    await curriculum_cache.ensure_loaded()
+    grades, topics, modules = curriculum_cache.grades, curriculum_cache.topics, curriculum_cache.modules
+
+    def fields(doc, *drop):
+        return {k: v for k, v in doc.items() if k not in ("_id", "created_at") + drop}
+
+    for grade in grades.values():
+        yield {"type": "grade", **fields(grade)}
+    for topic in topics.values():
+        grade = grades.get(topic["grade_id"])
+        if grade:
+            yield {"type": "topic", "grade_number": grade["grade_number"], **fields(topic, "grade_id")}
+    for module in modules.values():
+        topic = topics.get(module["topic_id"])
+        grade = grades.get(topic["grade_id"]) if topic else None
+        if grade:
+            yield {"type": "module", "grade_number": grade["grade_number"], "topic_order": topic["order"],
+                   **fields(module, "topic_id")}
+
+    # Content is streamed from the cursor, so memory stays flat however large it gets
+    async for doc in secondary_db.content.find({}).sort([("module_id", 1), ("content_type", 1)]):
+        module = modules.get(doc["module_id"])
+        topic = topics.get(module["topic_id"]) if module else None
+        grade = grades.get(topic["grade_id"]) if topic else None
+        if grade:
+            yield {"type": "content", "grade_number": grade["grade_number"], "topic_order": topic["order"],
+                   "module_order": module["order"], **fields(shape_document(doc, Content), "module_id")}
+
+# The export round-trips through the importer, answer keys included, so it is admin only
+@api_router.get("/export", dependencies=ADMIN_ROUTE)
+async def export_curriculum():
+    return ndjson_response(export_records())
+
+# Initialize database with sample data
+@api_router.post("/initialize-data", status_code=202, response_model=SeedJob, dependencies=ADMIN_ROUTE)
+async def initialize_data():
+    """Initialize the database with grade structure and 7th grade content"""
+    def summarize(importer):
+        grade_7_id = importer.ids["grade"].get((7,))
+        return {
+            "message": f"Database initialized successfully! Created {importer.stats['grade']['records']} grades. Grade 7 ID: {grade_7_id}",
+            "grade_7_id": grade_7_id,
+        }
+
+    return await seed_jobs.submit("initialize-data", SEED_DIR / "grades.json", summarize)
 
 # Include the router in the main app
 app.include_router(api_router)
 
+# Request counts and latency per route template
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        path = route.path if route else "unmatched"
+        metrics.observe("http_request_duration_seconds", (("method", request.method), ("route", path)), time.perf_counter() - started)
+        metrics.inc("http_requests_total", (("method", request.method), ("route", path), ("status", str(status))))
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return Response(metrics.exposition(), media_type="text/plain; version=0.0.4")
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -693,6 +2420,64 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def connect_worker():
+    # Under gunicorn --preload the module was imported before the fork
+    if client_pid != os.getpid():
+        connect()
+
+@app.on_event("startup")
+async def warm_connection_pool():
+    # Open minPoolSize connections now so the first requests don't pay for the handshakes
+    try:
+        await asyncio.gather(*(client.admin.command("ping") for _ in range(max(1, MONGO_POOL_OPTIONS["minPoolSize"]))))
+        logger.info("MongoDB connection pool warmed: %s", pool_metrics.stats())
+    except Exception as e:
+        logger.warning(f"Could not warm MongoDB connection pool: {str(e)}")
+
+@app.on_event("startup")
+async def detect_causal_sessions():
+    try:
+        # Primary reads already see every acknowledged write
+        user_sessions.enabled = USER_READ_PREFERENCE != Primary() and await supports_transactions(client)
+        logger.info("Causally consistent user sessions: %s", "enabled" if user_sessions.enabled else "disabled")
+    except Exception as e:
+        logger.warning(f"Could not detect replication, user reads stay on the primary: {str(e)}")
+
+@app.on_event("startup")
+async def create_indexes():
+    try:
+        await ensure_indexes()
+    except Exception as e:
+        logger.warning(f"Could not create indexes: {str(e)}")
+
+@app.on_event("startup")
+async def warm_curriculum_cache():
+    try:
+        # Read the revision first so writes made while warming are loaded again afterwards
+        revision = await curriculum_watcher.current()
+        curriculum_watcher.revision = revision["revision"] if revision else 0
+        await curriculum_cache.ensure_loaded()
+        logger.info("Curriculum cache warmed: %s", curriculum_cache.stats())
+        await content_snapshots.publish()
+        logger.info("Content snapshots published: %s", content_snapshots.stats())
+    except Exception as e:
+        logger.warning(f"Could not warm curriculum cache: {str(e)}")
+
+@app.on_event("startup")
+async def start_progress_buffer():
+    progress_buffer.start()
+
+@app.on_event("startup")
+async def start_curriculum_watcher():
+    curriculum_watcher.start()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await curriculum_watcher.stop()
+    await seed_jobs.stop()
+    try:
+        await progress_buffer.stop()
+    except Exception as e:
+        logger.warning(f"Could not flush pending progress: {str(e)}")
     client.close()
\ No newline at end of file
@@ -0,0 +1,195 @@
+"""Materialized progress summaries for dashboards and leaderboards.
+
+topic_progress holds one document per user and topic, grade_leaderboard one
+per user and grade. Both are kept current by folding every flushed batch of
+progress events in with $inc/$max upserts, and can be recomputed from the
+progress_events collection with an aggregation pipeline:
+
+    python summaries.py
+"""
+import asyncio
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+# Counter fields of a topic_progress document and the events that increment them
+TOPIC_COUNTERS = ("views", "exercises_answered", "exercises_correct", "questions_answered", "questions_correct", "quiz_attempts")
+
+
+def event_counters(event: Dict[str, Any]) -> Dict[str, int]:
+    event_type = event["event_type"]
+    if event_type == "module_viewed":
+        return {"views": 1}
+    if event_type == "exercise_answered":
+        return {"exercises_answered": 1, "exercises_correct": int(bool(event.get("is_correct")))}
+    if event_type == "question_answered":
+        return {"questions_answered": 1, "questions_correct": int(bool(event.get("is_correct")))}
+    if event_type == "quiz_scored":
+        return {"quiz_attempts": 1}
+    return {}
+
+
+def _fold(updates: Dict[str, Dict[str, Any]], doc_id: str, on_insert: Dict[str, Any],
+          inc: Dict[str, int], maxes: Dict[str, Any]):
+    update = updates.setdefault(doc_id, {"$inc": {}, "$max": {}, "$setOnInsert": on_insert})
+    for field, value in inc.items():
+        update["$inc"][field] = update["$inc"].get(field, 0) + value
+    for field, value in maxes.items():
+        update["$max"][field] = max(update["$max"].get(field, value), value)
+
+
+def summary_updates(events: Iterable[Dict[str, Any]], modules: Dict[str, dict],
+                    topics: Dict[str, dict]) -> Tuple[List[UpdateOne], List[UpdateOne]]:
+    """Upserts folding a batch of progress events into topic_progress and grade_leaderboard"""
+    topic_updates: Dict[str, Dict[str, Any]] = {}
+    grade_updates: Dict[str, Dict[str, Any]] = {}
+    for event in events:
+        module = modules.get(event["module_id"])
+        if not module:
+            continue
+        user_id, topic_id = event["user_id"], module["topic_id"]
+        grade_id = topics.get(topic_id, {}).get("grade_id")
+        counters = event_counters(event)
+        maxes = {"last_activity_at": event["created_at"]}
+        if event["event_type"] == "quiz_scored" and event.get("score") is not None:
+            maxes[f"best_quiz_scores.{event['module_id']}"] = event["score"]
+        _fold(topic_updates, f"{user_id}:{topic_id}", {"user_id": user_id, "topic_id": topic_id, "grade_id": grade_id},
+              counters, maxes)
+
+        # Leaderboard points are correct answers, to exercises and quiz questions alike.
+        # Question and quiz events only come from server-side quiz grading
+        correct = {k: counters.get(k, 0) for k in ("exercises_correct", "questions_correct")}
+        if grade_id:
+            _fold(grade_updates, f"{user_id}:{grade_id}", {"user_id": user_id, "grade_id": grade_id},
+                  {**correct, "points": sum(correct.values())}, {"last_activity_at": event["created_at"]})
+
+    def ops(updates):
+        return [UpdateOne({"_id": doc_id}, {op: fields for op, fields in update.items() if fields}, upsert=True)
+                for doc_id, update in updates.items()]
+
+    return ops(topic_updates), ops(grade_updates)
+
+
+async def write_summaries(db, events: List[Dict[str, Any]], modules: Dict[str, dict], topics: Dict[str, dict],
+                          session=None):
+    topic_ops, grade_ops = summary_updates(events, modules, topics)
+    if topic_ops:
+        await db.topic_progress.bulk_write(topic_ops, ordered=False, session=session)
+    if grade_ops:
+        await db.grade_leaderboard.bulk_write(grade_ops, ordered=False, session=session)
+
+
+def _lookup_parent(collection: str, local_field: str, as_field: str) -> List[Dict[str, Any]]:
+    """Join the parent document; ids are stored as strings, so convert before the _id lookup"""
+    return [
+        {"$addFields": {f"{as_field}_oid": {"$toObjectId": f"${local_field}"}}},
+        {"$lookup": {"from": collection, "localField": f"{as_field}_oid", "foreignField": "_id", "as": as_field}},
+        {"$unwind": f"${as_field}"},
+    ]
+
+
+def _count_if(condition: Dict[str, Any]) -> Dict[str, Any]:
+    return {"$sum": {"$cond": [condition, 1, 0]}}
+
+
+def _is(event_type: str) -> Dict[str, Any]:
+    return {"$eq": ["$event_type", event_type]}
+
+
+def topic_progress_pipeline() -> List[Dict[str, Any]]:
+    """Recompute topic_progress from progress_events, replacing the collection when done"""
+    correct = {"$eq": ["$is_correct", True]}
+    return [
+        # Per user and module first, so the curriculum lookups run once per pair rather than per event
+        {"$group": {
+            "_id": {"user_id": "$user_id", "module_id": "$module_id"},
+            "views": _count_if(_is("module_viewed")),
+            "exercises_answered": _count_if(_is("exercise_answered")),
+            "exercises_correct": _count_if({"$and": [_is("exercise_answered"), correct]}),
+            "questions_answered": _count_if(_is("question_answered")),
+            "questions_correct": _count_if({"$and": [_is("question_answered"), correct]}),
+            "quiz_attempts": _count_if(_is("quiz_scored")),
+            "best_quiz_score": {"$max": {"$cond": [_is("quiz_scored"), "$score", None]}},
+            "last_activity_at": {"$max": "$created_at"},
+        }},
+        {"$match": {"_id.module_id": {"$regex": "^[0-9a-f]{24}$"}}},
+        *_lookup_parent("modules", "_id.module_id", "module"),
+        *_lookup_parent("topics", "module.topic_id", "topic"),
+        {"$group": {
+            "_id": {"user_id": "$_id.user_id", "topic_id": "$module.topic_id"},
+            "grade_id": {"$first": "$topic.grade_id"},
+            **{field: {"$sum": f"${field}"} for field in TOPIC_COUNTERS},
+            "best_quiz_scores": {"$push": {"k": "$_id.module_id", "v": "$best_quiz_score"}},
+            "last_activity_at": {"$max": "$last_activity_at"},
+        }},
+        {"$project": {
+            "_id": {"$concat": ["$_id.user_id", ":", "$_id.topic_id"]},
+            "user_id": "$_id.user_id",
+            "topic_id": "$_id.topic_id",
+            "grade_id": 1,
+            **{field: 1 for field in TOPIC_COUNTERS},
+            "best_quiz_scores": {"$arrayToObject": {
+                "$filter": {"input": "$best_quiz_scores", "cond": {"$ne": ["$$this.v", None]}},
+            }},
+            "last_activity_at": 1,
+        }},
+        {"$out": "topic_progress"},
+    ]
+
+
+def grade_leaderboard_pipeline() -> List[Dict[str, Any]]:
+    """Recompute grade_leaderboard from a freshly rebuilt topic_progress"""
+    return [
+        {"$group": {
+            "_id": {"user_id": "$user_id", "grade_id": "$grade_id"},
+            "exercises_correct": {"$sum": "$exercises_correct"},
+            "questions_correct": {"$sum": "$questions_correct"},
+            "last_activity_at": {"$max": "$last_activity_at"},
+        }},
+        {"$project": {
+            "_id": {"$concat": ["$_id.user_id", ":", "$_id.grade_id"]},
+            "user_id": "$_id.user_id",
+            "grade_id": "$_id.grade_id",
+            "points": {"$add": ["$exercises_correct", "$questions_correct"]},
+            "exercises_correct": 1,
+            "questions_correct": 1,
+            "last_activity_at": 1,
+        }},
+        {"$out": "grade_leaderboard"},
+    ]
+
+
+async def rebuild_summaries(db) -> Dict[str, int]:
+    """Recompute both summary collections; $out swaps each one in atomically"""
+    await db.progress_events.aggregate(topic_progress_pipeline(), allowDiskUse=True).to_list(None)
+    await db.topic_progress.aggregate(grade_leaderboard_pipeline(), allowDiskUse=True).to_list(None)
+    return {
+        "topic_progress": await db.topic_progress.estimated_document_count(),
+        "grade_leaderboard": await db.grade_leaderboard.estimated_document_count(),
+    }
+
+
+def main(mongo_url: Optional[str] = None, db_name: Optional[str] = None):
+    """Rebuild the progress summary collections from progress_events"""
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+
+    async def run():
+        client = AsyncIOMotorClient(mongo_url or os.environ['MONGO_URL'])
+        try:
+            print(json.dumps(await rebuild_summaries(client[db_name or os.environ['DB_NAME']]), indent=2))
+        finally:
+            client.close()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    import typer
+
+    typer.run(main)
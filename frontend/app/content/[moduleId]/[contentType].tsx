@@ -25,12 +25,23 @@ interface Content {
     question: string;
     options: Array<{
       option_text: string;
-      is_correct: boolean;
     }>;
     explanation: string;
   }>;
 }
 
+interface QuizGrade {
+  correct: number;
+  total: number;
+  score: number;
+  results: Array<{
+    selected_option: number | null;
+    correct_option: number | null;
+    is_correct: boolean;
+    explanation: string;
+  }>;
+}
+
 export default function ContentDetail() {
   const router = useRouter();
   const { moduleId, contentType, contentTitle, moduleName } = useLocalSearchParams();
@@ -38,6 +49,7 @@ export default function ContentDetail() {
   const [loading, setLoading] = useState(true);
   const [selectedAnswers, setSelectedAnswers] = useState<{[key: number]: number}>({});
   const [showResults, setShowResults] = useState(false);
+  const [quizGrade, setQuizGrade] = useState<QuizGrade | null>(null);
 
   const EXPO_PUBLIC_BACKEND_URL = process.env.EXPO_PUBLIC_BACKEND_URL;
 
@@ -69,24 +81,36 @@ export default function ContentDetail() {
     }));
   };
 
-  const handleSubmitQuiz = () => {
-    setShowResults(true);
+  const handleSubmitQuiz = async () => {
+    if (!content?.quiz_questions) return;
+
+    try {
+      // Answers are graded on the server, the quiz payload has no answer key
+      const answers = content.quiz_questions.map((_, index) => selectedAnswers[index] ?? null);
+      const response = await fetch(`${EXPO_PUBLIC_BACKEND_URL}/api/modules/${moduleId}/quiz/grade`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ answers }),
+      });
+      if (response.ok) {
+        setQuizGrade(await response.json());
+        setShowResults(true);
+      } else {
+        console.error('Error grading quiz');
+      }
+    } catch (error) {
+      console.error('Error grading quiz:', error);
+    }
   };
 
   const calculateScore = () => {
-    if (!content?.quiz_questions) return 0;
-    
-    let correct = 0;
-    content.quiz_questions.forEach((question, index) => {
-      const selectedOption = selectedAnswers[index];
-      if (selectedOption !== undefined && question.options[selectedOption]?.is_correct) {
-        correct++;
-      }
-    });
-    
-    return Math.round((correct / content.quiz_questions.length) * 100);
+    if (!quizGrade) return 0;
+    return Math.round(quizGrade.score * 100);
   };
 
+  const isCorrectOption = (questionIndex: number, optionIndex: number) =>
+    quizGrade?.results[questionIndex]?.correct_option === optionIndex;
+
   const renderGlossary = () => (
     <View style={styles.contentSection}>
       <View style={styles.sectionHeader}>
@@ -230,8 +254,8 @@ export default function ContentDetail() {
                 style={[
                   styles.optionButton,
                   selectedAnswers[index] === optionIndex && styles.selectedOption,
-                  showResults && option.is_correct && styles.correctOption,
-                  showResults && selectedAnswers[index] === optionIndex && !option.is_correct && styles.incorrectOption
+                  showResults && isCorrectOption(index, optionIndex) && styles.correctOption,
+                  showResults && selectedAnswers[index] === optionIndex && !isCorrectOption(index, optionIndex) && styles.incorrectOption
                 ]}
                 onPress={() => !showResults && handleAnswerSelect(index, optionIndex)}
                 disabled={showResults}
@@ -239,7 +263,7 @@ export default function ContentDetail() {
                 <Text style={[
                   styles.optionText,
                   selectedAnswers[index] === optionIndex && styles.selectedOptionText,
-                  showResults && option.is_correct && styles.correctOptionText
+                  showResults && isCorrectOption(index, optionIndex) && styles.correctOptionText
                 ]}>
                   {String.fromCharCode(65 + optionIndex)}. {option.option_text}
                 </Text>
@@ -250,7 +274,7 @@ export default function ContentDetail() {
           {showResults && (
             <View style={styles.explanationContainer}>
               <Text style={styles.explanationTitle}>Explicación:</Text>
-              <Text style={styles.explanationText}>{question.explanation}</Text>
+              <Text style={styles.explanationText}>{quizGrade?.results[index]?.explanation ?? question.explanation}</Text>
             </View>
           )}
         </View>
@@ -18,6 +18,10 @@ interface Grade {
   description: string;
 }
 
+interface GradeTree extends Grade {
+  topics: Topic[];
+}
+
 export default function GradeTopics() {
   const router = useRouter();
   const { gradeNumber } = useLocalSearchParams();
@@ -35,18 +39,13 @@ export default function GradeTopics() {
     try {
       setLoading(true);
       
-      // First, get all grades to find the one we need
-      const gradesResponse = await fetch(`${EXPO_PUBLIC_BACKEND_URL}/api/grades`);
-      const grades = await gradesResponse.json();
-      const currentGrade = grades.find((g: Grade) => g.grade_number === parseInt(gradeNumber as string));
+      // Get the grade with its topics and modules in a single request
+      const treeResponse = await fetch(`${EXPO_PUBLIC_BACKEND_URL}/api/grades/by-number/${gradeNumber}/tree`);
       
-      if (currentGrade) {
-        setGrade(currentGrade);
-        
-        // Then get topics for this grade
-        const topicsResponse = await fetch(`${EXPO_PUBLIC_BACKEND_URL}/api/grades/${currentGrade._id}/topics`);
-        const topicsData = await topicsResponse.json();
-        setTopics(topicsData);
+      if (treeResponse.ok) {
+        const gradeTree: GradeTree = await treeResponse.json();
+        setGrade(gradeTree);
+        setTopics(gradeTree.topics);
       }
     } catch (error) {
       console.error('Error fetching grade and topics:', error);
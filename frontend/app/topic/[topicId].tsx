@@ -10,6 +10,16 @@ interface Module {
   order: number;
 }
 
+interface TopicTree {
+  _id: string;
+  modules: Module[];
+}
+
+interface GradeTree {
+  grade_number: number;
+  topics: TopicTree[];
+}
+
 export default function TopicModules() {
   const router = useRouter();
   const { topicId, topicName, gradeNumber } = useLocalSearchParams();
@@ -25,9 +35,11 @@ export default function TopicModules() {
   const fetchModules = async () => {
     try {
       setLoading(true);
-      const response = await fetch(`${EXPO_PUBLIC_BACKEND_URL}/api/topics/${topicId}/modules`);
-      const modulesData = await response.json();
-      setModules(modulesData);
+      // The grade tree already includes every topic's modules
+      const response = await fetch(`${EXPO_PUBLIC_BACKEND_URL}/api/grades/by-number/${gradeNumber}/tree`);
+      const gradeTree: GradeTree = await response.json();
+      const topic = gradeTree.topics?.find((t) => t._id === topicId);
+      setModules(topic ? topic.modules : []);
     } catch (error) {
       console.error('Error fetching modules:', error);
     } finally {
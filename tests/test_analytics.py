@@ -0,0 +1,93 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+from pydantic import ValidationError
+
+import analytics
+import server
+
+QUESTIONS = [
+    {"question": "¿-3 + 5?", "options": [{"option_text": "2"}, {"option_text": "-8"}, {"option_text": "8"}]},
+    {"question": "¿-2 × -4?", "options": [{"option_text": "8"}, {"option_text": "-8"}]},
+]
+START = datetime(2026, 1, 1)
+
+
+def answers(rows):
+    """question_answered rows as events_frame builds them: (user, item, option, correct)"""
+    return pd.DataFrame({
+        "user_id": [r[0] for r in rows],
+        "item_index": [r[1] for r in rows],
+        "selected_option": [r[2] for r in rows],
+        "is_correct": [r[3] for r in rows],
+        "created_at": [START + timedelta(seconds=i) for i in range(len(rows))],
+    })
+
+
+def test_question_stats_counts_first_answers_and_wrong_options():
+    stats = analytics.question_stats(answers([
+        ("a", 0, 0, True), ("b", 0, 1, False), ("c", 0, 1, False), ("a", 1, 0, True),
+        ("b", 0, 0, True),  # a retry, only the first answer counts
+    ]), QUESTIONS)
+
+    assert stats[0]["responses"] == 3
+    assert stats[0]["difficulty"] == pytest.approx(1 / 3, abs=1e-4)
+    assert stats[0]["wrong_options"] == [{"option": 1, "option_text": "-8", "count": 2}]
+    assert stats[1]["responses"] == 1
+
+
+def test_question_stats_skips_answers_outside_the_quiz():
+    stats = analytics.question_stats(answers([
+        ("a", None, 0, True),  # no item_index
+        ("b", 7, 0, False),  # question the quiz no longer has
+        ("c", -1, 0, False),
+        ("d", 1, -9, False),  # negative option
+        ("e", 1, 5, False),  # option the question does not have
+        ("f", 1, None, False),
+    ]), QUESTIONS)
+
+    assert stats[0]["responses"] == 0
+    assert stats[1]["responses"] == 3
+    assert stats[1]["wrong_options"] == []
+
+
+def test_question_stats_without_options_recorded():
+    stats = analytics.question_stats(answers([("a", 0, None, False), ("b", 0, None, True)]), QUESTIONS)
+    assert stats[0]["responses"] == 2
+    assert stats[0]["wrong_options"] == []
+
+
+def test_module_mastery_prefers_the_best_quiz_score():
+    events = pd.DataFrame({
+        "user_id": ["a", "a", "a", "b"],
+        "module_id": ["m1", "m1", "m1", "m1"],
+        "event_type": ["exercise_answered", "quiz_scored", "quiz_scored", "exercise_answered"],
+        "is_correct": [False, None, None, True],
+        "score": [None, 0.5, 0.9, None],
+    })
+    mastery = analytics.module_mastery(events, ["m1", "m2"], threshold=0.8)
+
+    assert mastery[0]["students"] == 2
+    assert mastery[0]["mastery"] == pytest.approx(0.95)
+    assert mastery[0]["mastered"] == 1.0
+    assert mastery[1] == {"module_id": "m2", "students": 0, "mastery": None, "mastered": None,
+                          "exercise_accuracy": None, "quiz_score": None}
+
+
+@pytest.mark.parametrize("event", [
+    {"event_type": "question_answered", "is_correct": True, "item_index": 0},
+    {"event_type": "quiz_scored", "score": 1.0},
+])
+def test_clients_cannot_post_graded_events(event):
+    with pytest.raises(server.HTTPException) as error:
+        asyncio.run(server.record_progress("0" * 24, server.ProgressReport(module_id="0" * 24, **event)))
+    assert error.value.status_code == 400
+
+
+def test_clients_cannot_post_negative_indexes():
+
+    for field in ("item_index", "selected_option"):
+        with pytest.raises(ValidationError):
+            server.ProgressReport(event_type="exercise_answered", module_id="0" * 24, is_correct=False, **{field: -9})
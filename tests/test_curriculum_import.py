@@ -0,0 +1,108 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from curriculum_import import CurriculumImportError, import_curriculum
+from server import RECORD_MODELS
+
+
+def curriculum(theory="Los enteros incluyen los negativos", quiz=True):
+    content = [
+        {"type": "content", "grade_number": 7, "topic_order": 1, "module_order": 1,
+         "content_type": "theory", "title": "Teoría", "theory_content": theory},
+    ]
+    if quiz:
+        content.append({"type": "content", "grade_number": 7, "topic_order": 1, "module_order": 1,
+                        "content_type": "quiz", "title": "Quiz", "quiz_questions": []})
+    return [
+        {"type": "grade", "grade_number": 7, "grade_name": "7mo Grado", "description": "Séptimo grado"},
+        {"type": "topic", "grade_number": 7, "order": 1, "name": "Números enteros", "description": "ℤ", "icon": "🔢"},
+        {"type": "module", "grade_number": 7, "topic_order": 1, "order": 1, "name": "Suma y Resta", "description": "Suma"},
+        *content,
+    ]
+
+
+async def records(items):
+    for item in items:
+        yield item
+
+
+def run_import(db, items, prune=False):
+    return asyncio.run(import_curriculum(db, records(items), prune=prune, batch_size=2, models=RECORD_MODELS))
+
+
+@pytest.fixture
+def database():
+    return AsyncMongoMockClient()["import_test"]
+
+
+async def snapshot(db):
+    return {
+        name: await db[name].find({}, {"import_id": 0}).sort("_id", 1).to_list(None)
+        for name in ("grades", "topics", "modules", "content")
+    }
+
+
+def test_reimporting_the_same_records_changes_nothing(database):
+    first = run_import(database, curriculum())
+    before = asyncio.run(snapshot(database))
+    second = run_import(database, curriculum())
+
+    assert first.stats["content"]["inserted"] == 2
+    assert second.stats["content"] == {"records": 2, "inserted": 0, "matched": 2}
+    assert asyncio.run(snapshot(database)) == before
+
+
+def test_changed_content_moves_updated_at_only_on_that_document(database):
+    long_ago = datetime(2020, 1, 1)
+    run_import(database, curriculum())
+    asyncio.run(database.content.update_many({}, {"$set": {"updated_at": long_ago}}))
+    before = {d["content_type"]: d for d in asyncio.run(snapshot(database))["content"]}
+    run_import(database, curriculum(theory="Los enteros son ℤ"))
+    after = {d["content_type"]: d for d in asyncio.run(snapshot(database))["content"]}
+
+    assert after["theory"]["content_hash"] != before["theory"]["content_hash"]
+    assert after["theory"]["updated_at"] > long_ago
+    assert after["theory"]["created_at"] == before["theory"]["created_at"]
+    assert after["quiz"]["updated_at"] == long_ago
+
+
+def test_prune_removes_only_documents_missing_from_the_import(database):
+    run_import(database, curriculum())
+    importer = run_import(database, curriculum(quiz=False), prune=True)
+
+    assert importer.pruned == {"topic": 0, "module": 0, "content": 1}
+    content = asyncio.run(database.content.find({}).to_list(None))
+    assert [c["content_type"] for c in content] == ["theory"]
+    assert asyncio.run(database.modules.count_documents({})) == 1
+
+
+def test_without_prune_missing_documents_are_kept(database):
+    run_import(database, curriculum())
+    importer = run_import(database, curriculum(quiz=False))
+
+    assert importer.pruned == {"topic": 0, "module": 0, "content": 0}
+    assert asyncio.run(database.content.count_documents({})) == 2
+
+
+def test_child_of_an_unknown_parent_is_rejected(database):
+    orphan = {"type": "topic", "grade_number": 9, "order": 1, "name": "Sin grado", "description": "", "icon": ""}
+    with pytest.raises(CurriculumImportError):
+        run_import(database, [{"type": "grade", "grade_number": 9}, orphan])
+
+
+@pytest.mark.parametrize("index, change", [
+    # A quiz question without options would break grading and every later publish
+    (4, {"quiz_questions": [{"question": "q"}]}),
+    # Topics are served with a description and an icon
+    (1, {"description": None}),
+    (3, {"title": None}),
+])
+def test_records_that_do_not_match_their_model_are_rejected_before_any_write(database, index, change):
+    items = curriculum()
+    items[index] = {k: v for k, v in {**items[index], **change}.items() if v is not None}
+    with pytest.raises(CurriculumImportError, match="is invalid"):
+        asyncio.run(import_curriculum(database, records(items), models=RECORD_MODELS))
+    assert asyncio.run(database.content.count_documents({})) == 0
@@ -0,0 +1,50 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import server
+
+
+@pytest.fixture
+def publishes(monkeypatch):
+    calls = []
+
+    async def publish():
+        calls.append(None)
+
+    async def publish_modules(module_ids):
+        calls.append(module_ids)
+
+    async def ensure_loaded():
+        pass
+
+    monkeypatch.setattr(server.content_snapshots, "publish", publish)
+    monkeypatch.setattr(server.content_snapshots, "publish_modules", publish_modules)
+    monkeypatch.setattr(server.curriculum_cache, "ensure_loaded", ensure_loaded)
+    return calls
+
+
+def importer(revision, modules):
+    return SimpleNamespace(revision=revision, touched_modules=set(modules))
+
+
+def test_own_import_after_the_last_loaded_revision_renders_its_modules(publishes, monkeypatch):
+    monkeypatch.setattr(server.curriculum_watcher, "revision", 4)
+    asyncio.run(server.refresh_after_import(importer(5, ["m1"])))
+    assert publishes == [["m1"]]
+    assert server.curriculum_watcher.revision == 5
+
+
+def test_own_import_over_an_unloaded_revision_publishes_everything(publishes, monkeypatch):
+    # Another worker wrote revision 5, which this worker has not loaded yet
+    monkeypatch.setattr(server.curriculum_watcher, "revision", 4)
+    asyncio.run(server.refresh_after_import(importer(6, ["m1"])))
+    assert publishes == [None]
+    assert server.curriculum_watcher.revision == 6
+
+
+def test_revision_already_loaded_by_the_watcher_is_not_rendered_again(publishes, monkeypatch):
+    monkeypatch.setattr(server.curriculum_watcher, "revision", 6)
+    asyncio.run(server.refresh_after_import(importer(6, ["m1"])))
+    assert publishes == []
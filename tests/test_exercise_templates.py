@@ -0,0 +1,62 @@
+import re
+
+import pytest
+
+from exercise_templates import TEMPLATES, GeneratedSets
+
+NUMBER = r"\(?(-?\d+)\)?"
+
+
+@pytest.mark.parametrize("name", sorted(TEMPLATES))
+def test_generation_is_deterministic(name):
+    template = TEMPLATES[name]
+    assert template.generate(7, 50) == template.generate(7, 50)
+    assert template.generate(7, 50) != template.generate(8, 50)
+
+
+@pytest.mark.parametrize("name", sorted(TEMPLATES))
+def test_options_are_distinct_with_one_correct(name):
+    for exercise in TEMPLATES[name].generate(1, 2000):
+        texts = [option["option_text"] for option in exercise["options"]]
+        assert len(set(texts)) == 4
+        assert sum(option["is_correct"] for option in exercise["options"]) == 1
+
+
+def test_multiplication_division_explanations_match_problems():
+    for exercise in TEMPLATES["integer_multiplication_division"].generate(3, 2000):
+        x, op, y = re.match(rf"¿Cuánto es (-?\d+) ([×÷]) {NUMBER}\?", exercise["problem"]).groups()
+        x, y = int(x), int(y)
+        result = x * y if op == "×" else x // y
+        assert (x // y) * y == x or op == "×"
+        correct = next(o["option_text"] for o in exercise["options"] if o["is_correct"])
+        assert int(correct) == result
+        same_sign = (x > 0) == (y > 0)
+        expected = "Signos iguales" if same_sign else "Signos distintos"
+        assert exercise["explanation"].startswith(expected), exercise
+        assert (result > 0) == same_sign
+
+
+def test_addition_subtraction_answers_match_problems():
+    for exercise in TEMPLATES["integer_addition_subtraction"].generate(3, 2000):
+        x, op, y = re.match(rf"¿Cuánto es (-?\d+) ([+-]) {NUMBER}\?", exercise["problem"]).groups()
+        result = int(x) + int(y) if op == "+" else int(x) - int(y)
+        correct = next(o["option_text"] for o in exercise["options"] if o["is_correct"])
+        assert int(correct) == result
+        assert exercise["explanation"].endswith(f"= {result}")
+
+
+def test_pages_match_the_whole_set():
+    template = TEMPLATES["integer_order_comparison"]
+    whole = template.generate(5, 450)
+    sets = GeneratedSets(max_chunks=2)
+    assert sets.get(template, 5, range(95, 305)) == whole[95:305]
+    assert sets.get(template, 5, range(2, 450, 3)) == whole[2::3]
+    assert all(e["difficulty"] == "hard" for e in whole[2::3])
+    assert len(sets.chunks) == 2
+
+
+def test_uncached_pages_are_not_stored():
+    sets = GeneratedSets(max_chunks=10)
+    sets.get(TEMPLATES["integer_addition_subtraction"], 9, range(10), cache=False)
+    assert sets.chunks == {}
+    assert sets.stats()["uncached"] == 1
@@ -0,0 +1,107 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+from mongomock_motor import AsyncMongoMockClient
+from pymongo.errors import AutoReconnect
+
+import server
+
+
+@pytest.fixture
+def database(monkeypatch):
+    db = AsyncMongoMockClient()["progress_test"]
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server.user_sessions, "enabled", False)
+    return db
+
+
+def viewed(module_id):
+    return server.ProgressEvent(event_type="module_viewed", module_id=module_id)
+
+
+def test_failed_event_insert_does_not_repeat_the_user_update(database, monkeypatch):
+    async def run():
+        user_id = str((await database.users.insert_one({"name": "Ana"})).inserted_id)
+        module_id = str(ObjectId())
+        buffer = server.ProgressBuffer(flush_interval=60, flush_size=1000)
+        buffer.add(user_id, viewed(module_id))
+
+        collection_type = type(database.progress_events)
+        insert_many = collection_type.insert_many
+        calls = []
+
+        async def flaky_insert(self, *args, **kwargs):
+            calls.append(1)
+            if len(calls) == 1:
+                raise AutoReconnect("connection reset")
+            return await insert_many(self, *args, **kwargs)
+
+        monkeypatch.setattr(collection_type, "insert_many", flaky_insert)
+        with pytest.raises(AutoReconnect):
+            await buffer.flush()
+        assert not buffer.has_pending(user_id)
+        assert len(buffer.events) == 1
+
+        await buffer.flush()
+        user = await database.users.find_one({"_id": ObjectId(user_id)})
+        assert user["progress"]["modules"][module_id]["views"] == 1
+        assert await database.progress_events.count_documents({}) == 1
+        assert buffer.events == []
+
+    asyncio.run(run())
+
+
+def test_already_stored_events_are_not_inserted_again(database):
+    async def run():
+        user_id = str((await database.users.insert_one({"name": "Ana"})).inserted_id)
+        buffer = server.ProgressBuffer(flush_interval=60, flush_size=1000)
+        buffer.add(user_id, viewed(str(ObjectId())))
+        # As if an earlier attempt stored the event but the reply was lost
+        await database.progress_events.insert_one(dict(buffer.events[0]))
+        await buffer.flush()
+        assert await database.progress_events.count_documents({}) == 1
+        assert buffer.events == []
+
+    asyncio.run(run())
+
+
+def test_size_triggered_flush_is_kept_and_its_failure_logged(database, monkeypatch, caplog):
+    async def run():
+        async def failing_flush():
+            raise AutoReconnect("connection reset")
+
+        buffer = server.ProgressBuffer(flush_interval=60, flush_size=1)
+        monkeypatch.setattr(buffer, "flush", failing_flush)
+        buffer.add(str(ObjectId()), viewed(str(ObjectId())))
+        task = buffer._size_flush
+        assert task is not None
+        await asyncio.gather(task, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert "Progress flush failed" in caplog.text
+
+
+def test_reported_progress_is_stamped_with_the_server_time(monkeypatch):
+    user_id, module_id = str(ObjectId()), str(ObjectId())
+    added = []
+
+    async def ensure_loaded():
+        pass
+
+    async def exists(_):
+        return True
+
+    monkeypatch.setattr(server.curriculum_cache, "ensure_loaded", ensure_loaded)
+    monkeypatch.setattr(server.curriculum_cache, "modules", {module_id: {"_id": module_id}})
+    monkeypatch.setattr(server.known_users, "exists", exists)
+    monkeypatch.setattr(server.progress_buffer, "add", lambda user, event: added.append(event))
+
+    report = server.ProgressReport.model_validate(
+        {"event_type": "module_viewed", "module_id": module_id, "created_at": "2999-01-01T00:00:00"}
+    )
+    asyncio.run(server.record_progress(user_id, report))
+
+    assert added[0].created_at < datetime(2100, 1, 1)
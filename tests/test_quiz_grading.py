@@ -0,0 +1,68 @@
+import asyncio
+
+import orjson
+import pytest
+
+import server
+
+MODULE_ID = "0" * 24
+
+
+def option(text, correct=False):
+    return {"option_text": text, "is_correct": correct}
+
+
+QUIZ = {
+    "module_id": MODULE_ID,
+    "content_type": "quiz",
+    "title": "Quiz",
+    "quiz_questions": [
+        {"question": "¿-3 + 5?", "options": [option("2", True), option("-8"), option("8")], "explanation": "5 - 3"},
+        # A question whose options were all imported as wrong
+        {"question": "¿-2 × -4?", "options": [option("-8"), option("-6")], "explanation": "8"},
+    ],
+}
+
+
+@pytest.fixture(autouse=True)
+def published_quiz(monkeypatch):
+    monkeypatch.setattr(server.content_snapshots, "answer_keys", {MODULE_ID: server.answer_key(QUIZ)})
+
+
+def grade(answers):
+    response = asyncio.run(server.grade_quiz(MODULE_ID, server.QuizSubmission(answers=answers)))
+    return orjson.loads(response.body)
+
+
+def test_grading_uses_the_answer_key():
+    graded = grade([0, 1])
+    assert [r["is_correct"] for r in graded["results"]] == [True, False]
+    assert graded["results"][0]["correct_option"] == 0
+    assert graded["score"] == 0.5
+
+
+def test_a_question_without_a_correct_option_is_never_correct():
+    graded = grade([None, None])
+    assert graded["results"][1]["correct_option"] is None
+    assert graded["correct"] == 0
+
+
+@pytest.mark.parametrize("answers", [[0, -1], [-9, 0], [3, 0], [0, 2]])
+def test_answers_outside_the_options_are_rejected(answers):
+    with pytest.raises(server.HTTPException) as error:
+        grade(answers)
+    assert error.value.status_code == 400
+
+
+def test_wrong_answer_count_is_rejected():
+    with pytest.raises(server.HTTPException) as error:
+        grade([0])
+    assert error.value.status_code == 400
+
+
+def test_public_quiz_has_no_answers():
+    public = server.public_content(QUIZ)
+    for question in public["quiz_questions"]:
+        assert all(set(o) == {"option_text"} for o in question["options"])
+    # The stored document keeps them for grading
+    assert QUIZ["quiz_questions"][0]["options"][0]["is_correct"] is True
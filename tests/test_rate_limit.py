@@ -0,0 +1,34 @@
+from starlette.requests import Request
+
+import server
+
+
+def request(headers=None, host="10.0.0.1", path_params=None):
+    scope = {
+        "type": "http",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+        "client": (host, 1234),
+        "path_params": path_params or {},
+    }
+    return Request(scope)
+
+
+def test_forwarded_for_is_ignored_by_default(monkeypatch):
+    monkeypatch.setattr(server, "TRUST_FORWARDED_FOR", False)
+    assert server.client_key(request({"X-Forwarded-For": "1.2.3.4"})) == "ip:10.0.0.1"
+
+
+def test_trusted_proxy_address_is_the_last_hop(monkeypatch):
+    monkeypatch.setattr(server, "TRUST_FORWARDED_FOR", True)
+    spoofed = request({"X-Forwarded-For": "6.6.6.6, 203.0.113.7"})
+    assert server.client_key(spoofed) == "ip:203.0.113.7"
+
+
+def test_user_routes_are_limited_per_user():
+    assert server.client_key(request(path_params={"user_id": "abc"})) == "user:abc"
+
+
+def test_token_bucket_refuses_past_the_burst():
+    limiter = server.TokenBucketLimiter(rate=0.001, burst=3)
+    assert [limiter.take("k") for _ in range(3)] == [0, 0, 0]
+    assert limiter.take("k") > 0